@@ -44,6 +44,7 @@ from Autodesk.Revit.DB import (
     Viewport,
     View,
     Family,
+    ElementId,
 )
 
 # UnitUtils disponivel apenas no Revit 2022+
@@ -53,8 +54,13 @@ try:
 except ImportError:
     _HAS_UNIT = False
 
-from collections import Counter, OrderedDict, defaultdict
-import os, csv, datetime, json, sys
+from collections import Counter, OrderedDict
+import os, csv, datetime, json, shutil, sys
+
+try:
+    from cStringIO import StringIO   # Python 2 / IronPython
+except ImportError:
+    from io import StringIO          # Python 3
 
 # ============================================================
 # CONFIGURACOES (AJUSTE AQUI)
@@ -66,6 +72,9 @@ TOP_N            = 15   # Quantidade de itens em cada ranking
 BAR_WIDTH        = 18   # Largura da barra ASCII de progresso
 # ============================================================
 
+_BOM = b"\xef\xbb\xbf"   # BOM UTF-8 ja codificado (Excel reconhece o encoding)
+_IO_BUFFER = 1 << 20      # buffer de escrita dos arquivos (1 MiB)
+
 doc = revit.doc
 app = __revit__.Application  # objeto principal do Revit
 
@@ -80,9 +89,14 @@ ROOT_DIR   = os.path.join(BASE_DIR, ROOT_FOLDER_NAME)
 RUN_DIR    = os.path.join(ROOT_DIR, model_safe, PLUGIN_NAME, run_stamp)
 LATEST_DIR = os.path.join(ROOT_DIR, model_safe, "latest", PLUGIN_NAME)
 
+# makedirs direto: sem a janela entre exists() e makedirs(); o OSError so
+# e propagado se a pasta de fato nao existir (IronPython 2 nao tem exist_ok).
 for _d in [RUN_DIR, LATEST_DIR]:
-    if not os.path.exists(_d):
+    try:
         os.makedirs(_d)
+    except OSError:
+        if not os.path.isdir(_d):
+            raise
 
 
 # ============================================================
@@ -113,16 +127,39 @@ def u8(x):
         return u""
 
 
-def eid_int(eid):
+# A propriedade do ElementId e escolhida uma vez, no import: testar .Value
+# a cada chamada lancaria (e trataria) um AttributeError por elemento no
+# Revit 2022-2023, caro no IronPython.
+if hasattr(ElementId, "Value"):
+    def eid_int(eid):
+        """
+        Retorna o valor inteiro de um ElementId.
+        Revit 2024+: usa .Value (Int64; IntegerValue foi descontinuado)
+        """
+        return eid.Value
+else:
+    def eid_int(eid):
+        """
+        Retorna o valor inteiro de um ElementId.
+        Revit 2022-2023: usa .IntegerValue
+        """
+        return eid.IntegerValue
+
+
+_cat_names = {}   # Category.Id (int) -> nome da categoria
+
+
+def category_name(cat):
     """
-    Retorna o valor inteiro de um ElementId ou WorksetId.
-    Revit 2022-2023: usa .IntegerValue
-    Revit 2024+    : usa .Value  (Int64; IntegerValue foi removido)
+    Retorna o nome da categoria, memorizado por Category.Id.
+    Category.Name cruza a fronteira da API Revit (string localizada) a cada
+    leitura; com o cache o nome e materializado uma vez por categoria.
     """
-    try:
-        return eid.Value          # Revit 2024+
-    except AttributeError:
-        return eid.IntegerValue   # Revit 2022-2023
+    cid  = eid_int(cat.Id)
+    name = _cat_names.get(cid)
+    if name is None:
+        name = _cat_names[cid] = u8(cat.Name)
+    return name
 
 
 def to_meters(internal_value):
@@ -155,20 +192,14 @@ def normalize_json(obj):
     return obj
 
 
-def write_bom_csv(path):
-    """Abre CSV com BOM UTF-8 (compativel com Excel)."""
-    if sys.version_info[0] >= 3:
-        return open(path, "w", encoding="utf-8-sig", newline="")
-    f = open(path, "wb")
-    f.write(b"\xef\xbb\xbf")
-    return f
-
-
-def csv_row(*cols):
-    """Gera linha CSV compativel com Python 2 (bytes) e Python 3 (str)."""
-    if sys.version_info[0] >= 3:
+# Linha CSV compativel com Python 2 (bytes) e Python 3 (str). A versao do
+# interpretador e decidida uma vez, na definicao, e nao a cada linha.
+if sys.version_info[0] >= 3:
+    def csv_row(*cols):
         return [u8(c) for c in cols]
-    return [u8(c).encode("utf-8") for c in cols]
+else:
+    def csv_row(*cols):
+        return [u8(c).encode("utf-8") for c in cols]
 
 
 def bar(value, maximum, width=BAR_WIDTH):
@@ -180,19 +211,65 @@ def bar(value, maximum, width=BAR_WIDTH):
     return u"[" + u"\u2588" * filled + u"\u2591" * (width - filled) + u"]"
 
 
+def write_bytes(data, *paths):
+    """
+    Grava o buffer de bytes no primeiro caminho (historico); os demais
+    (latest) recebem uma copia do arquivo pronto.
+    """
+    first = paths[0]
+    with open(first, "wb") as f:
+        f.write(data)
+    for path in paths[1:]:
+        shutil.copyfile(first, path)
+
+
+def write_csv_text(text, *paths):
+    """
+    Grava texto CSV ja formatado com BOM UTF-8 (compativel com Excel) no
+    historico e copia o arquivo para o latest.
+    """
+    if sys.version_info[0] >= 3:
+        data = text.encode("utf-8-sig")
+    else:
+        data = _BOM + text
+    write_bytes(data, *paths)
+
+
+def save_csv(rows, *paths):
+    """
+    Monta o CSV uma unica vez em memoria, grava no historico e copia o
+    arquivo para o latest.
+    """
+    buf = StringIO()
+    csv.writer(buf).writerows(rows)
+    write_csv_text(buf.getvalue(), *paths)
+
+
+# Arquivo do JSON: ensure_ascii=True garante saida ASCII, gravada em
+# streaming pelo json.dump com buffer de _IO_BUFFER bytes.
+if sys.version_info[0] >= 3:
+    def _open_json(path):
+        return open(path, "w", _IO_BUFFER, encoding="ascii", newline="")
+else:
+    def _open_json(path):
+        return open(path, "wb", _IO_BUFFER)
+
+
 def save_json(obj, *paths):
-    """Serializa dicionario para JSON UTF-8 em todos os caminhos fornecidos."""
-    for path in paths:
-        try:
-            safe = normalize_json(obj)
-            blob = json.dumps(safe, indent=2, ensure_ascii=True)
-            if isinstance(blob, _unicode):
-                blob = blob.encode("utf-8")
-            with open(path, "wb") as jf:
-                jf.write(blob)
-        except Exception as ex:
-            with open(path, "wb") as jf:
-                jf.write((u'{"error": "' + u8(str(ex)) + u'"}').encode("utf-8"))
+    """
+    Normaliza o dicionario uma vez e grava o JSON em streaming no primeiro
+    caminho (historico), sem montar a string inteira em memoria; os demais
+    (latest) recebem uma copia do arquivo pronto.
+    """
+    first = paths[0]
+    try:
+        data = normalize_json(obj)
+        with _open_json(first) as jf:
+            json.dump(data, jf, indent=2, ensure_ascii=True)
+    except Exception as ex:
+        write_bytes((u'{"error": "' + u8(str(ex)) + u'"}').encode("utf-8"), first)
+    for path in paths[1:]:
+        shutil.copyfile(first, path)
 
 
 # ============================================================
@@ -209,22 +286,39 @@ output.print_md(
     u"**Modelo:** `{}`  \n**Execucao:** `{}`".format(u8(model), run_stamp)
 )
 
+# As secoes abaixo nao desenham no painel durante a coleta: cada
+# print_md/print_table e enfileirado e tudo e renderizado de uma vez depois
+# que CSV e JSON estao gravados, para a atualizacao do HTML nao atrasar
+# os arquivos.
+_painel = []
+
+
+def painel_md(text):
+    _painel.append((output.print_md, (text,), {}))
+
+
+def painel_table(rows, columns=None):
+    _painel.append((output.print_table, (rows,), {"columns": columns}))
+
 
 # ============================================================
 # COLETA GLOBAL (base unica para todos os rankings)
 # ============================================================
 # WhereElementIsNotElementType exclui tipos/familias e retorna apenas instancias.
+# list() consome o collector direto: sem o IList intermediario do ToElements().
+# A lista continua necessaria para as passadas de familias, tipos, niveis e
+# worksets; o total e guardado uma vez em n_elements.
 all_elements = list(
     FilteredElementCollector(doc)
     .WhereElementIsNotElementType()
-    .ToElements()
 )
+n_elements = len(all_elements)
 
 
 # ============================================================
 # 1. INFORMACOES DO PROJETO
 # ============================================================
-output.print_md(u"---\n## 1. Informacoes do Projeto")
+painel_md(u"---\n## 1. Informacoes do Projeto")
 
 proj = doc.ProjectInformation
 proj_table = [
@@ -236,15 +330,15 @@ proj_table = [
     [u"Autor",           u8(proj.Author)],
     [u"Data de Emissao", u8(proj.IssueDate)],
 ]
-output.print_table(proj_table, columns=[u"Campo", u"Valor"])
+painel_table(proj_table, columns=[u"Campo", u"Valor"])
 
 
 # ============================================================
 # 2. VERSAO DO REVIT
 # ============================================================
-output.print_md(u"---\n## 2. Versao do Revit")
+painel_md(u"---\n## 2. Versao do Revit")
 
-output.print_table([
+painel_table([
     [u"Versao", u8(str(app.VersionNumber))],
     [u"Nome",   u8(str(app.VersionName))],
     [u"Build",  u8(str(app.VersionBuild))],
@@ -257,35 +351,48 @@ output.print_table([
 # (necessaria antes das Estatisticas Gerais)
 # ============================================================
 
+# Como em all_elements, list() consome cada collector direto, sem o IList
+# intermediario do ToElements().
+
 # Todas as vistas (Views) — inclui ViewSheet, ViewPlan, View3D, etc.
 all_views = list(
-    FilteredElementCollector(doc).OfClass(View).ToElements()
+    FilteredElementCollector(doc).OfClass(View)
 )
 
-# Apenas folhas (Sheets)
-sheets = list(
-    FilteredElementCollector(doc).OfClass(ViewSheet).ToElements()
-)
+# Apenas folhas (Sheets) — percorridas uma unica vez pelo iterador do
+# collector (sem materializar IList<Element>); guarda apenas as tuplas
+# (numero, nome, qtd_viewports, id) usadas pelo ranking e pelo CSV.
+sheets_data = []
+n_sheets    = 0
+_sh_it = FilteredElementCollector(doc).OfClass(ViewSheet).GetElementIterator()
+_sh_it.Reset()
+while _sh_it.MoveNext():
+    sh = _sh_it.Current
+    n_sheets += 1
+    try:
+        sheets_data.append((
+            u8(sh.SheetNumber),
+            u8(sh.Name),
+            sh.GetAllViewports().Count,
+            sh.Id,
+        ))
+    except Exception:
+        pass
 
 # Niveis / Pavimentos
 levels = list(
-    FilteredElementCollector(doc).OfClass(Level).ToElements()
+    FilteredElementCollector(doc).OfClass(Level)
 )
 
 # Modelos linkados
 links = list(
-    FilteredElementCollector(doc).OfClass(RevitLinkInstance).ToElements()
+    FilteredElementCollector(doc).OfClass(RevitLinkInstance)
 )
 
-# Opcoes de projeto (Design Options)
-d_opts = list(
-    FilteredElementCollector(doc).OfClass(DesignOption).ToElements()
-)
-
-# Familias carregadas no modelo
-families = list(
-    FilteredElementCollector(doc).OfClass(Family).ToElements()
-)
+# Opcoes de projeto e familias carregadas so entram como totais: contadas
+# pelo proprio collector, sem trazer os elementos para o Python.
+n_d_opts   = FilteredElementCollector(doc).OfClass(DesignOption).GetElementCount()
+n_families = FilteredElementCollector(doc).OfClass(Family).GetElementCount()
 
 # Alertas (Warnings) do modelo
 warnings = []
@@ -312,52 +419,69 @@ except Exception:
 # ============================================================
 # 3. ESTATISTICAS GERAIS
 # ============================================================
-output.print_md(u"---\n## 3. Estatisticas Gerais")
+painel_md(u"---\n## 3. Estatisticas Gerais")
 
-phases_count = 0
+# doc.Phases materializado uma unica vez: o total e a tabela da secao 13
+# usam a mesma lista.
+phases_list = None
 try:
-    phases_count = len(list(doc.Phases))
+    phases_list = list(doc.Phases)
 except Exception:
     pass
+phases_count = len(phases_list) if phases_list is not None else 0
+n_links      = len(links)
 
 stats_table = [
-    [u"Total de Elementos (instancias)", str(len(all_elements))],
-    [u"Familias Carregadas",             str(len(families))],
-    [u"Folhas (Sheets)",                 str(len(sheets))],
+    [u"Total de Elementos (instancias)", str(n_elements)],
+    [u"Familias Carregadas",             str(n_families)],
+    [u"Folhas (Sheets)",                 str(n_sheets)],
     [u"Vistas (total)",                  str(len(all_views))],
     [u"Niveis / Pavimentos",             str(len(levels))],
-    [u"Modelos Linkados (RVT)",          str(len(links))],
+    [u"Modelos Linkados (RVT)",          str(n_links)],
     [u"Fases do Projeto",                str(phases_count)],
-    [u"Design Options",                  str(len(d_opts))],
+    [u"Design Options",                  str(n_d_opts)],
     [u"Alertas (Warnings)",              str(len(warnings))],
     [u"Workshared",                      u"Sim" if doc.IsWorkshared else u"Nao"],
     [u"Worksets de Usuario",             str(worksets_count)],
 ]
-output.print_table(stats_table, columns=[u"Metrica", u"Valor"])
+painel_table(stats_table, columns=[u"Metrica", u"Valor"])
 
 
 # ============================================================
 # 4. TOP CATEGORIAS DE ELEMENTOS
 # ============================================================
-output.print_md(u"---\n## 4. Top {} Categorias de Elementos".format(TOP_N))
+painel_md(u"---\n## 4. Top {} Categorias de Elementos".format(TOP_N))
 
-# Agrupa IDs de elementos por nome de categoria
-cats_map = defaultdict(list)
-for el in all_elements:
+# Contagem por categoria feita pelo filtro nativo do Revit: um collector
+# por categoria com GetElementCount(), sem iterar instancias em Python.
+# FirstElementId() (apenas para categorias com instancias) fornece o
+# elemento de exemplo para o link do painel.
+cat_counter = Counter()
+cat_sample  = {}   # nome da categoria -> ElementId de exemplo
+for cat in doc.Settings.Categories:
     try:
-        if el.Category:
-            cats_map[el.Category.Name].append(el.Id)
+        qty = (FilteredElementCollector(doc)
+               .OfCategoryId(cat.Id)
+               .WhereElementIsNotElementType()
+               .GetElementCount())
+        if qty:
+            name = category_name(cat)
+            cat_counter[name] += qty
+            if name not in cat_sample:
+                cat_sample[name] = (FilteredElementCollector(doc)
+                                    .OfCategoryId(cat.Id)
+                                    .WhereElementIsNotElementType()
+                                    .FirstElementId())
     except Exception:
         pass
 
-cat_counter = Counter({k: len(v) for k, v in cats_map.items()})
 total_elems = sum(cat_counter.values())
 max_cat_qty = cat_counter.most_common(1)[0][1] if cat_counter else 1
 
 cats_table = []
 for cat, qty in cat_counter.most_common(TOP_N):
     pct       = round(qty * 100.0 / total_elems, 1) if total_elems else 0
-    sample_id = cats_map[cat][0] if cats_map[cat] else None
+    sample_id = cat_sample.get(cat)
     link      = output.linkify(sample_id) if sample_id else u"—"
     cats_table.append([
         u8(cat),
@@ -368,10 +492,10 @@ for cat, qty in cat_counter.most_common(TOP_N):
     ])
 
 if cats_table:
-    output.print_table(cats_table, columns=[u"Categoria", u"Qtd", u"%", u"Distribuicao", u"Exemplo"])
+    painel_table(cats_table, columns=[u"Categoria", u"Qtd", u"%", u"Distribuicao", u"Exemplo"])
 else:
-    output.print_md(u"_Nenhuma categoria encontrada._")
-output.print_md(
+    painel_md(u"_Nenhuma categoria encontrada._")
+painel_md(
     u"_Total: {} categorias | {} instancias_".format(len(cat_counter), total_elems)
 )
 
@@ -379,10 +503,13 @@ output.print_md(
 # ============================================================
 # 5. TOP FAMILIAS (por numero de instancias)
 # ============================================================
-output.print_md(u"---\n## 5. Top {} Familias por Instancias".format(TOP_N))
+painel_md(u"---\n## 5. Top {} Familias por Instancias".format(TOP_N))
 
-# FamilyName esta disponivel no Symbol de instancias ou no tipo do elemento
-family_map = defaultdict(list)
+# FamilyName esta disponivel no Symbol de instancias ou no tipo do elemento.
+# Os rankings so usam a contagem e um elemento de exemplo por familia:
+# guarda-se o primeiro ElementId, nao a lista de todos os Ids do modelo.
+fam_counter = Counter()
+fam_sample  = {}   # familia -> ElementId de exemplo
 for el in all_elements:
     try:
         fam_name = None
@@ -395,37 +522,39 @@ for el in all_elements:
             if typ is not None and hasattr(typ, "FamilyName"):
                 fam_name = u8(typ.FamilyName)
         if fam_name:
-            family_map[fam_name].append(el.Id)
+            fam_counter[fam_name] += 1
+            if fam_name not in fam_sample:
+                fam_sample[fam_name] = el.Id
     except Exception:
         pass
 
-fam_counter  = Counter({k: len(v) for k, v in family_map.items()})
 total_fam_qty = sum(fam_counter.values())
 max_fam_qty  = fam_counter.most_common(1)[0][1] if fam_counter else 1
 
 fams_table = []
 for fam, qty in fam_counter.most_common(TOP_N):
     pct       = round(qty * 100.0 / total_fam_qty, 1) if total_fam_qty else 0
-    sample_id = family_map[fam][0] if family_map[fam] else None
+    sample_id = fam_sample.get(fam)
     link      = output.linkify(sample_id) if sample_id else u"—"
     fams_table.append([u8(fam), str(qty), u"{}%".format(pct), bar(qty, max_fam_qty), link])
 
 if fams_table:
-    output.print_table(fams_table, columns=[u"Familia", u"Instancias", u"%", u"Distribuicao", u"Exemplo"])
+    painel_table(fams_table, columns=[u"Familia", u"Instancias", u"%", u"Distribuicao", u"Exemplo"])
 else:
-    output.print_md(u"_Nenhuma familia com instancias encontrada._")
-output.print_md(u"_Total: {} familias unicas com instancias_".format(len(fam_counter)))
+    painel_md(u"_Nenhuma familia com instancias encontrada._")
+painel_md(u"_Total: {} familias unicas com instancias_".format(len(fam_counter)))
 
 
 # ============================================================
 # 6. TOP TIPOS DE FAMILIA (por numero de instancias)
 # ============================================================
-output.print_md(u"---\n## 6. Top {} Tipos de Familia por Instancias".format(TOP_N))
+painel_md(u"---\n## 6. Top {} Tipos de Familia por Instancias".format(TOP_N))
 
 # label = "FamiliaName : TipoName" para identificacao inequivoca.
 # Usa el.Symbol (FamilyInstances) como fonte primaria — mais confiavel em
 # IronPython do que doc.GetElement(el.GetTypeId()) para familias de sistema.
-type_map = defaultdict(list)
+type_counter = Counter()
+type_sample  = {}   # label -> ElementId de exemplo
 for el in all_elements:
     try:
         fam_name  = u""
@@ -443,49 +572,42 @@ for el in all_elements:
                     type_name = u8(typ.Name)
                     fam_name  = u8(getattr(typ, "FamilyName", u""))
         # Fallback: usa nome da categoria como familia quando nao ha FamilyName
-        if not fam_name and el.Category:
-            fam_name = u8(el.Category.Name)
+        if not fam_name:
+            cat = el.Category
+            if cat:
+                fam_name = category_name(cat)
         if not type_name:
             type_name = u8(el.Name) if hasattr(el, "Name") else u""
         if not type_name:
             continue
         label = u"{} : {}".format(fam_name, type_name) if fam_name else type_name
-        type_map[label].append(el.Id)
+        type_counter[label] += 1
+        if label not in type_sample:
+            type_sample[label] = el.Id
     except Exception:
         pass
 
-type_counter  = Counter({k: len(v) for k, v in type_map.items()})
 total_type_qty = sum(type_counter.values())
 max_type_qty  = type_counter.most_common(1)[0][1] if type_counter else 1
 
 types_table = []
 for label, qty in type_counter.most_common(TOP_N):
     pct       = round(qty * 100.0 / total_type_qty, 1) if total_type_qty else 0
-    sample_id = type_map[label][0] if type_map[label] else None
+    sample_id = type_sample.get(label)
     link      = output.linkify(sample_id) if sample_id else u"—"
     types_table.append([u8(label), str(qty), u"{}%".format(pct), bar(qty, max_type_qty), link])
 
 if types_table:
-    output.print_table(types_table, columns=[u"Familia : Tipo", u"Instancias", u"%", u"Distribuicao", u"Exemplo"])
+    painel_table(types_table, columns=[u"Familia : Tipo", u"Instancias", u"%", u"Distribuicao", u"Exemplo"])
 else:
-    output.print_md(u"_Nenhum tipo de familia com instancias encontrado._")
-output.print_md(u"_Total: {} tipos unicos com instancias_".format(len(type_counter)))
+    painel_md(u"_Nenhum tipo de familia com instancias encontrado._")
+painel_md(u"_Total: {} tipos unicos com instancias_".format(len(type_counter)))
 
 
 # ============================================================
 # 7. TOP FOLHAS (Sheets por numero de vistas/viewports)
 # ============================================================
-output.print_md(u"---\n## 7. Top {} Folhas por Numero de Vistas".format(TOP_N))
-
-sheets_data = []
-for sh in sheets:
-    try:
-        number   = u8(sh.SheetNumber)
-        name     = u8(sh.Name)
-        vp_count = len(list(sh.GetAllViewports()))
-        sheets_data.append((number, name, vp_count, sh.Id))
-    except Exception:
-        pass
+painel_md(u"---\n## 7. Top {} Folhas por Numero de Vistas".format(TOP_N))
 
 # Ordena por quantidade de vistas (decrescente)
 sheets_data.sort(key=lambda x: x[2], reverse=True)
@@ -506,16 +628,16 @@ for number, name, vp_count, sh_id in sheets_data[:TOP_N]:
     ])
 
 if sheets_table:
-    output.print_table(sheets_table, columns=[u"Numero", u"Nome", u"Vistas", u"%", u"Distribuicao", u"Abrir"])
+    painel_table(sheets_table, columns=[u"Numero", u"Nome", u"Vistas", u"%", u"Distribuicao", u"Abrir"])
 else:
-    output.print_md(u"_Nenhuma folha encontrada no modelo._")
-output.print_md(u"_Total de folhas: {}_".format(len(sheets)))
+    painel_md(u"_Nenhuma folha encontrada no modelo._")
+painel_md(u"_Total de folhas: {}_".format(n_sheets))
 
 
 # ============================================================
 # 8. VISTAS POR TIPO
 # ============================================================
-output.print_md(u"---\n## 8. Vistas por Tipo")
+painel_md(u"---\n## 8. Vistas por Tipo")
 
 view_type_counter = Counter()
 for v in all_views:
@@ -532,33 +654,40 @@ vt_table = [
     for vt, cnt in view_type_counter.most_common()
 ]
 if vt_table:
-    output.print_table(vt_table, columns=[u"Tipo de Vista", u"Quantidade", u"%", u"Distribuicao"])
+    painel_table(vt_table, columns=[u"Tipo de Vista", u"Quantidade", u"%", u"Distribuicao"])
 else:
-    output.print_md(u"_Nenhuma vista encontrada._")
-output.print_md(u"_Total de vistas: {}_".format(len(all_views)))
+    painel_md(u"_Nenhuma vista encontrada._")
+painel_md(u"_Total de vistas: {}_".format(len(all_views)))
 
 
 # ============================================================
 # 9. NIVEIS / PAVIMENTOS
 # ============================================================
-output.print_md(u"---\n## 9. Niveis / Pavimentos")
-
-# Ordena do pavimento mais baixo para o mais alto (por elevacao interna)
-levels_sorted = sorted(levels, key=lambda lv: lv.Elevation)
-
-# Conta instancias associadas a cada nivel via LevelId
-level_elem_counter = Counter()
-for el in all_elements:
-    try:
-        lv_id = el.LevelId
-        if lv_id is not None:
-            level_elem_counter[eid_int(lv_id)] += 1
-    except Exception:
-        pass
+painel_md(u"---\n## 9. Niveis / Pavimentos")
+
+# Ordena do pavimento mais baixo para o mais alto (por elevacao interna).
+# Cada Elevation e lido uma vez numa list comprehension, sem chamada de
+# lambda por nivel; o indice desempata niveis na mesma cota sem comparar
+# os objetos Level.
+levels_dec = [(lv.Elevation, i, lv) for i, lv in enumerate(levels)]
+levels_dec.sort()
+levels_sorted = [lv for _, _, lv in levels_dec]
+
+# Elevacao em metros convertida uma vez por nivel (UnitUtils e chamada da
+# API), a partir da cota ja lida acima; usada na tabela e no JSON.
+levels_elev_m = [to_meters(elev) for elev, _, _ in levels_dec]
+
+# Conta instancias associadas a cada nivel via LevelId. O Counter consome
+# o gerador direto, sem lista intermediaria do tamanho do modelo; a guarda
+# explicita substitui o try/except por elemento (custo real no IronPython).
+level_elem_counter = Counter(
+    eid_int(lv_id)
+    for lv_id in (getattr(el, "LevelId", None) for el in all_elements)
+    if lv_id is not None
+)
 
 lvl_table = []
-for lv in levels_sorted:
-    elev_m   = to_meters(lv.Elevation)
+for lv, elev_m in zip(levels_sorted, levels_elev_m):
     elem_cnt = level_elem_counter.get(eid_int(lv.Id), 0)
     link     = output.linkify(lv.Id)
     lvl_table.append([
@@ -569,51 +698,55 @@ for lv in levels_sorted:
     ])
 
 if lvl_table:
-    output.print_table(lvl_table, columns=[u"Nome", u"Elevacao", u"Elementos", u"Selecionar"])
+    painel_table(lvl_table, columns=[u"Nome", u"Elevacao", u"Elementos", u"Selecionar"])
 else:
-    output.print_md(u"_Nenhum nivel encontrado._")
-output.print_md(u"_Total: {} niveis_".format(len(levels)))
+    painel_md(u"_Nenhum nivel encontrado._")
+painel_md(u"_Total: {} niveis_".format(len(levels)))
 
 
 # ============================================================
 # 10. WORKSETS (apenas se modelo for workshared)
 # ============================================================
-output.print_md(u"---\n## 10. Worksets (Conjuntos de Trabalho)")
+painel_md(u"---\n## 10. Worksets (Conjuntos de Trabalho)")
 
 try:
     if doc.IsWorkshared and worksets_list:
-        # Conta elementos por workset usando o WorksetId de cada instancia
-        ws_elem_counter = Counter()
-        for el in all_elements:
-            try:
-                ws_elem_counter[eid_int(el.WorksetId)] += 1
-            except Exception:
-                pass
+        # Conta elementos por workset usando o WorksetId de cada instancia.
+        # O Counter consome o gerador numa unica passada (laco de contagem
+        # em C), como no contador de niveis. WorksetId nao tem .Value (so o
+        # ElementId do Revit 2024+ tem): IntegerValue e lido direto, pois
+        # eid_int vale so para ElementId.
+        ws_elem_counter = Counter(
+            ws_id.IntegerValue
+            for ws_id in (getattr(el, "WorksetId", None) for el in all_elements)
+            if ws_id is not None
+        )
+
+        # Contagem de cada workset lida uma vez e reaproveitada na ordenacao
+        # e na tabela.
+        ws_counts = [(ws_elem_counter.get(ws.Id.IntegerValue, 0), ws)
+                     for ws in worksets_list]
+        ws_counts.sort(key=lambda x: x[0], reverse=True)
 
         ws_table = []
-        for ws in sorted(
-            worksets_list,
-            key=lambda w: ws_elem_counter.get(eid_int(w.Id), 0),
-            reverse=True,
-        ):
-            cnt   = ws_elem_counter.get(eid_int(ws.Id), 0)
+        for cnt, ws in ws_counts:
             owner = u8(ws.Owner) if ws.Owner else u"(aberto)"
             state = u"Aberto" if ws.IsOpen else u"Fechado"
             ws_table.append([u8(ws.Name), owner, str(cnt), state])
 
         if ws_table:
-            output.print_table(ws_table, columns=[u"Workset", u"Proprietario", u"Elementos", u"Estado"])
-        output.print_md(u"_Total: {} worksets de usuario_".format(len(worksets_list)))
+            painel_table(ws_table, columns=[u"Workset", u"Proprietario", u"Elementos", u"Estado"])
+        painel_md(u"_Total: {} worksets de usuario_".format(len(worksets_list)))
     else:
-        output.print_md(u"_Modelo nao e workshared (sem worksets de usuario)._")
+        painel_md(u"_Modelo nao e workshared (sem worksets de usuario)._")
 except Exception as ex_ws:
-    output.print_md(u"_Erro ao ler worksets: {}_".format(u8(str(ex_ws))))
+    painel_md(u"_Erro ao ler worksets: {}_".format(u8(str(ex_ws))))
 
 
 # ============================================================
 # 11. TOP ALERTAS (Warnings)
 # ============================================================
-output.print_md(u"---\n## 11. Top Alertas do Modelo")
+painel_md(u"---\n## 11. Top Alertas do Modelo")
 
 if warnings:
     warn_counter = Counter()
@@ -630,17 +763,17 @@ if warnings:
         for desc, cnt in warn_counter.most_common(TOP_N)
     ]
     if warn_table:
-        output.print_table(warn_table, columns=[u"Descricao do Alerta", u"Ocorrencias", u"%"])
-    output.print_md(u"_Total de alertas: {}_".format(len(warnings)))
+        painel_table(warn_table, columns=[u"Descricao do Alerta", u"Ocorrencias", u"%"])
+    painel_md(u"_Total de alertas: {}_".format(len(warnings)))
 else:
     warn_counter = Counter()
-    output.print_md(u"_Nenhum alerta encontrado no modelo._")
+    painel_md(u"_Nenhum alerta encontrado no modelo._")
 
 
 # ============================================================
 # 12. MODELOS LINKADOS (RVT Links)
 # ============================================================
-output.print_md(u"---\n## 12. Modelos Linkados (RVT Links)")
+painel_md(u"---\n## 12. Modelos Linkados (RVT Links)")
 
 if links:
     lk_table = []
@@ -652,64 +785,79 @@ if links:
             status = u"Erro"
         lk_table.append([u8(lk.Name), status, output.linkify(lk.Id)])
     if lk_table:
-        output.print_table(lk_table, columns=[u"Nome do Link", u"Status", u"Selecionar"])
-    output.print_md(u"_Total: {} modelos linkados_".format(len(links)))
+        painel_table(lk_table, columns=[u"Nome do Link", u"Status", u"Selecionar"])
+    painel_md(u"_Total: {} modelos linkados_".format(n_links))
 else:
-    output.print_md(u"_Nenhum modelo linkado encontrado._")
+    painel_md(u"_Nenhum modelo linkado encontrado._")
 
 
 # ============================================================
 # 13. FASES DO PROJETO
 # ============================================================
-output.print_md(u"---\n## 13. Fases do Projeto")
+painel_md(u"---\n## 13. Fases do Projeto")
 
+phases_erro  = [[u"—", u"Erro ao ler fases", u"—"]]
 phases_table = []
-try:
-    for i, ph in enumerate(doc.Phases):
-        phases_table.append([str(i + 1), u8(ph.Name), u8(ph.Id.ToString())])
-except Exception:
-    phases_table = [[u"—", u"Erro ao ler fases", u"—"]]
+if phases_list is None:
+    phases_table = phases_erro
+else:
+    try:
+        for i, ph in enumerate(phases_list):
+            phases_table.append([str(i + 1), u8(ph.Name), u8(ph.Id.ToString())])
+    except Exception:
+        phases_table = phases_erro
 
 if phases_table:
-    output.print_table(phases_table, columns=[u"Ordem", u"Nome", u"ID"])
+    painel_table(phases_table, columns=[u"Ordem", u"Nome", u"ID"])
 else:
-    output.print_md(u"_Nenhuma fase encontrada._")
+    painel_md(u"_Nenhuma fase encontrada._")
 
 
 # ============================================================
 # EXPORTACAO CSV — Top Categorias
 # ============================================================
-for path in [os.path.join(RUN_DIR, "top_categorias.csv"),
-             os.path.join(LATEST_DIR, "top_categorias.csv")]:
-    f = write_bom_csv(path)
-    w = csv.writer(f)
-    w.writerow(csv_row("run_stamp", "model", "categoria", "quantidade", "percentual"))
-    for cat, qty in cat_counter.most_common():
-        pct = round(qty * 100.0 / total_elems, 2) if total_elems else 0
-        w.writerow(csv_row(run_stamp, model, cat, qty, pct))
-    f.close()
+# Cada CSV e montado uma vez e os mesmos bytes vao para historico e latest.
+# run_stamp e model sao constantes: convertidos uma unica vez, fora dos loops.
+const_cols = csv_row(run_stamp, model)
+
+# Linhas montadas num unico extend sobre o gerador, sem append por linha;
+# save_csv entrega a lista inteira a um writerows.
+cat_rows = [csv_row("run_stamp", "model", "categoria", "quantidade", "percentual")]
+cat_rows.extend(
+    const_cols + csv_row(
+        cat, qty, round(qty * 100.0 / total_elems, 2) if total_elems else 0)
+    for cat, qty in cat_counter.most_common()
+)
+save_csv(
+    cat_rows,
+    os.path.join(RUN_DIR,    "top_categorias.csv"),
+    os.path.join(LATEST_DIR, "top_categorias.csv"),
+)
 
 
 # EXPORTACAO CSV — Top Familias
-for path in [os.path.join(RUN_DIR, "top_familias.csv"),
-             os.path.join(LATEST_DIR, "top_familias.csv")]:
-    f = write_bom_csv(path)
-    w = csv.writer(f)
-    w.writerow(csv_row("run_stamp", "model", "familia", "instancias"))
-    for fam, qty in fam_counter.most_common():
-        w.writerow(csv_row(run_stamp, model, fam, qty))
-    f.close()
+fam_rows = [csv_row("run_stamp", "model", "familia", "instancias")]
+fam_rows.extend(
+    const_cols + csv_row(fam, qty) for fam, qty in fam_counter.most_common()
+)
+save_csv(
+    fam_rows,
+    os.path.join(RUN_DIR,    "top_familias.csv"),
+    os.path.join(LATEST_DIR, "top_familias.csv"),
+)
 
 
 # EXPORTACAO CSV — Top Folhas
-for path in [os.path.join(RUN_DIR, "top_folhas.csv"),
-             os.path.join(LATEST_DIR, "top_folhas.csv")]:
-    f = write_bom_csv(path)
-    w = csv.writer(f)
-    w.writerow(csv_row("run_stamp", "model", "numero", "nome", "vistas"))
-    for number, name, vp_count, _ in sheets_data:
-        w.writerow(csv_row(run_stamp, model, number, name, vp_count))
-    f.close()
+sheet_rows = [csv_row("run_stamp", "model", "numero", "nome", "vistas")]
+sheet_rows.extend(
+    const_cols + csv_row(number, name, vp_count)
+    for number, name, vp_count, _ in sheets_data
+)
+save_csv(
+    sheet_rows,
+    os.path.join(RUN_DIR,    "top_folhas.csv"),
+    os.path.join(LATEST_DIR, "top_folhas.csv"),
+)
 
 
 # ============================================================
@@ -734,18 +882,18 @@ resumo = {
         "issue_date": u8(proj.IssueDate),
     },
     "stats": {
-        "total_elements":    len(all_elements),
+        "total_elements":    n_elements,
         "unique_categories": len(cat_counter),
         "unique_families":   len(fam_counter),
         "unique_types":      len(type_counter),
-        "families_loaded":   len(families),
-        "sheets":            len(sheets),
+        "families_loaded":   n_families,
+        "sheets":            n_sheets,
         "views":             len(all_views),
         "levels":            len(levels),
-        "links":             len(links),
+        "links":             n_links,
         "phases":            phases_count,
         "warnings":          len(warnings),
-        "design_options":    len(d_opts),
+        "design_options":    n_d_opts,
         "is_workshared":     bool(doc.IsWorkshared),
         "worksets":          worksets_count,
     },
@@ -770,8 +918,8 @@ resumo = {
         for vt, cnt in view_type_counter.most_common()
     ],
     "levels": [
-        {"name": u8(lv.Name), "elevation_m": to_meters(lv.Elevation)}
-        for lv in levels_sorted
+        {"name": u8(lv.Name), "elevation_m": elev_m}
+        for lv, elev_m in zip(levels_sorted, levels_elev_m)
     ],
     "top_warnings": [
         {"description": u8(d), "count": c}
@@ -786,6 +934,13 @@ save_json(
 )
 
 
+# ============================================================
+# RENDERIZACAO DO PAINEL (arquivos ja gravados)
+# ============================================================
+for _fn, _args, _kw in _painel:
+    _fn(*_args, **_kw)
+
+
 # ============================================================
 # RODAPE — caminhos de saida no painel HTML
 # ============================================================
@@ -803,26 +958,30 @@ output.print_md(
 # ============================================================
 # SAIDA NO CONSOLE (complementar ao painel HTML)
 # ============================================================
-print("=" * 65)
-print("  RESUMO DO MODELO CONCLUIDO")
-print("=" * 65)
-print("  Modelo         : {}".format(model))
-print("  Revit          : {} ({})".format(app.VersionNumber, app.VersionName))
-print("  Data           : {}  Hora: {}".format(day, ts))
-print("-" * 65)
-print("  Elementos      : {}".format(len(all_elements)))
-print("  Categorias     : {}".format(len(cat_counter)))
-print("  Familias       : {}".format(len(fam_counter)))
-print("  Tipos          : {}".format(len(type_counter)))
-print("  Fam. carregadas: {}".format(len(families)))
-print("  Folhas         : {}".format(len(sheets)))
-print("  Vistas         : {}".format(len(all_views)))
-print("  Niveis         : {}".format(len(levels)))
-print("  Alertas        : {}".format(len(warnings)))
-print("  Links RVT      : {}".format(len(links)))
-print("  Workshared     : {}".format("Sim" if doc.IsWorkshared else "Nao"))
-print("-" * 65)
-print("  [Historico]    {}".format(RUN_DIR))
-print("  [Latest]       {}".format(LATEST_DIR))
-print("=" * 65)
-print("PROCESSO REALIZADO COM SUCESSO")
+# Uma unica escrita no stdout em vez de um print por linha.
+console_lines = [
+    "=" * 65,
+    "  RESUMO DO MODELO CONCLUIDO",
+    "=" * 65,
+    "  Modelo         : {}".format(model),
+    "  Revit          : {} ({})".format(app.VersionNumber, app.VersionName),
+    "  Data           : {}  Hora: {}".format(day, ts),
+    "-" * 65,
+    "  Elementos      : {}".format(n_elements),
+    "  Categorias     : {}".format(len(cat_counter)),
+    "  Familias       : {}".format(len(fam_counter)),
+    "  Tipos          : {}".format(len(type_counter)),
+    "  Fam. carregadas: {}".format(n_families),
+    "  Folhas         : {}".format(n_sheets),
+    "  Vistas         : {}".format(len(all_views)),
+    "  Niveis         : {}".format(len(levels)),
+    "  Alertas        : {}".format(len(warnings)),
+    "  Links RVT      : {}".format(n_links),
+    "  Workshared     : {}".format("Sim" if doc.IsWorkshared else "Nao"),
+    "-" * 65,
+    "  [Historico]    {}".format(RUN_DIR),
+    "  [Latest]       {}".format(LATEST_DIR),
+    "=" * 65,
+    "PROCESSO REALIZADO COM SUCESSO",
+]
+sys.stdout.write("\n".join(console_lines) + "\n")
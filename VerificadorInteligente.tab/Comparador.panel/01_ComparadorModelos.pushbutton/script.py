@@ -221,8 +221,7 @@ def _save_csv(path, diff):
     with write_bom_csv(path) as f:
         w = csv.writer(f)
         w.writerow([_u8(c) for c in COLS])
-        for row in diff:
-            w.writerow([_u8(row.get(c, u"")) for c in COLS])
+        w.writerows([_u8(row.get(c, u"")) for c in COLS] for row in diff)
 
 
 def _save_json(path, rvt_a, rvt_b, diff, resumo):
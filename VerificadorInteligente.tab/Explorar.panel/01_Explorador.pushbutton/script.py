@@ -15,6 +15,7 @@
 # ============================================================
 
 from pyrevit import revit, forms
+from collections import defaultdict
 import datetime
 
 from Autodesk.Revit.DB import (
@@ -104,12 +105,15 @@ def _fam_type(el):
 print("Coletando elementos...")
 elements = list(FilteredElementCollector(doc).WhereElementIsNotElementType())
 
-hier        = {}   # {cat: {fam: {typ: [inst_dict]}}}
+# {cat: {fam: {typ: [inst_dict]}}} — defaultdict aninhado: uma busca por
+# nível, sem o dict/lista vazio que cada setdefault alocava por elemento.
+hier        = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
 total_inst  = 0
 
 for el in elements:
     try:
-        cat = _safe(el.Category.Name) if el.Category else u"(sem categoria)"
+        c   = el.Category
+        cat = _safe(c.Name) if c else u"(sem categoria)"
         fam, typ = _fam_type(el)
         fam  = fam  or u"(sem familia)"
         typ  = typ  or u"(sem tipo)"
@@ -137,7 +141,7 @@ for el in elements:
             "phase_d": pd,
             "workset": ws,
         }
-        hier.setdefault(cat, {}).setdefault(fam, {}).setdefault(typ, []).append(inst)
+        hier[cat][fam][typ].append(inst)
         total_inst += 1
     except:
         continue
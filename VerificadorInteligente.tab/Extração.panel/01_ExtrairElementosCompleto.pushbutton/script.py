@@ -5,7 +5,11 @@
 # ============================================================
 # Extrai todos os elementos fisicos do modelo Revit gerando:
 #   elements.csv         -- um elemento por linha com metadados
-#   params.csv           -- todos os parametros (instancia + tipo)
+#   params.csv           -- parametros de instancia (por elemento) e de
+#                           tipo (uma vez por tipo, ligados via type_id)
+#                           Todos os parametros por padrao; com
+#                           ONLY_VISIBLE_PARAMS (extracao_lib) so os
+#                           visiveis na paleta Propriedades.
 #   model_hierarchy.json -- hierarquia Categoria > Familia > Tipo
 #
 # A logica de extracao vive em:
@@ -14,6 +18,7 @@
 
 from pyrevit import revit
 import datetime
+import heapq
 
 from extracao_lib import extrair_completo
 
@@ -70,10 +75,10 @@ print("")
 print("-" * 55)
 print("  HIERARQUIA (Top 15 categorias)")
 print("-" * 55)
-for cat_name, cat_data in sorted(hierarchy.items(),
-                                  key=lambda x: -x[1]["total"])[:15]:
+for cat_name, cat_data in heapq.nlargest(15, hierarchy.items(),
+                                         key=lambda x: x[1]["total"]):
     n_fams  = len(cat_data["families"])
-    n_types = sum(len(f["types"]) for f in cat_data["families"].values())
+    n_types = cat_data["total_types"]
     print("  {:>5}  {}  ({} familias, {} tipos)".format(
         cat_data["total"], cat_name, n_fams, n_types))
 print("=" * 55)
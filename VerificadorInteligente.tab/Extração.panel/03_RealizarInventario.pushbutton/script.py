@@ -71,7 +71,7 @@ day       = now.strftime("%Y-%m-%d")
 # EXECUCAO
 # ============================================================
 print("Coletando elementos e montando inventario por pavimento...")
-_t0 = datetime.datetime.now()
+_t0 = now   # mesmo instante do run_stamp; evita segunda leitura do relogio
 try:
     res = extrair_inventario_por_pavimento(
         doc, model, model_safe, run_stamp, day, now,
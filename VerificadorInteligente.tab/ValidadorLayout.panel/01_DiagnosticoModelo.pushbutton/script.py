@@ -35,8 +35,12 @@ from Autodesk.Revit.DB import (
     FilteredElementCollector,
     BuiltInCategory,
     BuiltInParameter,
+    ElementId,
+    ElementParameterFilter,
+    ParameterFilterRuleFactory,
     Level,
     Wall,
+    WallType,
     SpatialElement,
 )
 from Autodesk.Revit.DB.Architecture import Room
@@ -47,8 +51,18 @@ try:
 except ImportError:
     _HAS_UNIT = False
 
-from collections import Counter, defaultdict
-import os, csv, datetime, json, sys
+try:
+    from System.Text.RegularExpressions import Regex, RegexOptions
+    _HAS_NET_REGEX = True
+except ImportError:
+    _HAS_NET_REGEX = False
+
+import os, csv, datetime, json, re, shutil, sys
+
+try:
+    from cStringIO import StringIO   # Python 2 / IronPython
+except ImportError:
+    from io import StringIO          # Python 3
 
 # ============================================================
 # CONFIGURACOES -- AJUSTE PARA O PROJETO
@@ -81,6 +95,23 @@ KW_ACESSIVEL = [u"ACESSIVEL", u"ACESSIBILIDADE", u"PNE", u"DEFICIENTE"]
 KW_SAIDA     = [u"SAIDA", u"EMERGENCIA", u"ROTA FUGA", u"EVACUACAO"]
 KW_TI        = [u"TI", u"SERVIDOR", u"TELECOMUNICACAO", u"RACK", u"DATACENTER"]
 
+# ---------- PALAVRAS-CHAVE PARA TIPOS DE PAREDE ESPECIAIS ---
+KW_PAREDE_ESPECIAL = [u"BLIND", u"SEGUR", u"CORTA-FOGO", u"CORTA FOGO", u"FIRE", u"REFOR"]
+
+# ---------- VERIFICACOES OPCIONAIS ---------------------------
+# Paredes especiais (secao 7a) sao informativas (nao entram no score).
+# False pula a varredura inteira: nem tipos nem paredes sao lidos.
+VERIFICAR_PAREDES_ESPECIAIS = True
+
+KW_PE_DIREITO_HALL = KW_ESPERA + KW_CAIXA   # ambientes com pe-direito de hall
+
+# Uniao de todas as palavras-chave de ambientes (indice de pre-filtro de Rooms)
+KW_AMBIENTES = (KW_ESPERA + KW_CAIXA + KW_GERENTE + KW_COFRE + KW_SEGURANCA +
+                KW_ATM + KW_BANHEIRO + KW_ACESSIVEL + KW_SAIDA + KW_TI)
+
+_BOM = b"\xef\xbb\xbf"   # BOM UTF-8 ja codificado (Excel reconhece o encoding)
+_IO_BUFFER = 1 << 20      # buffer de escrita dos arquivos (1 MiB)
+
 AMBIENTES_OBRIGATORIOS = [
     (u"Hall / Espera",         KW_ESPERA),
     (u"Area de Caixas",        KW_CAIXA),
@@ -104,9 +135,14 @@ model_safe= model.replace("/", "_").replace("\\", "_").replace(":", "_")
 ROOT_DIR   = os.path.join(BASE_DIR, ROOT_FOLDER_NAME)
 RUN_DIR    = os.path.join(ROOT_DIR, model_safe, PLUGIN_NAME, run_stamp)
 LATEST_DIR = os.path.join(ROOT_DIR, model_safe, "latest", PLUGIN_NAME)
+# makedirs direto: sem a janela entre exists() e makedirs(); o OSError so
+# e propagado se a pasta de fato nao existir (IronPython 2 nao tem exist_ok).
 for _d in [RUN_DIR, LATEST_DIR]:
-    if not os.path.exists(_d):
+    try:
         os.makedirs(_d)
+    except OSError:
+        if not os.path.isdir(_d):
+            raise
 
 
 # ============================================================
@@ -136,10 +172,13 @@ def u8(x):
         return u""
 
 
-def eid_int(eid):
-    try:
+# Propriedade escolhida uma vez, no import, e nao testada a cada chamada:
+# no Revit 2022-2023 .Value lancaria um AttributeError por elemento.
+if hasattr(ElementId, "Value"):
+    def eid_int(eid):
         return eid.Value
-    except AttributeError:
+else:
+    def eid_int(eid):
         return eid.IntegerValue
 
 
@@ -161,9 +200,50 @@ def ft_to_m(ft):
         return 0.0
 
 
-def match_kw(name, keywords):
-    name_up = u8(name).upper()
-    return any(kw in name_up for kw in keywords)
+class _NetPattern(object):
+    """Adapta um Regex .NET compilado a interface .search() do modulo re."""
+    __slots__ = ("_rx",)
+
+    def __init__(self, rx):
+        self._rx = rx
+
+    def search(self, text):
+        m = self._rx.Match(text or u"")
+        return m if m.Success else None
+
+
+_kw_patterns = {}   # tuple(keywords) -> regex compilada
+
+
+def kw_pattern(keywords):
+    """
+    Compila a lista de palavras-chave numa unica alternancia regex
+    (case-insensitive), memorizada por lista. O nome e varrido uma vez,
+    em vez de um teste de substring por palavra-chave. Dentro do Revit
+    usa Regex .NET com RegexOptions.Compiled (IL compilado pelo JIT);
+    fora dele, o modulo re.
+    """
+    key = tuple(keywords)
+    pat = _kw_patterns.get(key)
+    if pat is None:
+        if _HAS_NET_REGEX:
+            pat = _NetPattern(Regex(
+                u"|".join(Regex.Escape(kw) for kw in keywords),
+                RegexOptions.Compiled | RegexOptions.IgnoreCase |
+                RegexOptions.CultureInvariant,
+            ))
+        else:
+            pat = re.compile(
+                u"|".join(re.escape(kw) for kw in keywords),
+                re.IGNORECASE | re.UNICODE,
+            )
+        _kw_patterns[key] = pat
+    return pat
+
+
+# Padroes usados dentro de loops: compilados uma vez, no carregamento.
+PAT_ACESSIVEL       = kw_pattern(KW_ACESSIVEL)
+PAT_PAREDE_ESPECIAL = kw_pattern(KW_PAREDE_ESPECIAL)
 
 
 def status_icon(ok):
@@ -187,32 +267,62 @@ def normalize_json(obj):
     return obj
 
 
-def write_bom_csv(path):
+def save_csv(rows, *paths):
+    """
+    Monta o CSV (BOM UTF-8) uma unica vez em memoria e grava no primeiro
+    caminho (historico) com um unico write; os demais (latest) recebem uma
+    copia do arquivo pronto.
+    """
+    buf = StringIO()
+    if sys.version_info[0] < 3:
+        buf.write(_BOM)
+    csv.writer(buf).writerows(rows)
+    data = buf.getvalue()
     if sys.version_info[0] >= 3:
-        return open(path, "w", encoding="utf-8-sig", newline="")
-    f = open(path, "wb")
-    f.write(b"\xef\xbb\xbf")
-    return f
+        data = data.encode("utf-8-sig")
+    first = paths[0]
+    with open(first, "wb") as f:
+        f.write(data)
+    for path in paths[1:]:
+        shutil.copyfile(first, path)
+
+
+# A versao do interpretador e decidida uma vez, na definicao, e nao a
+# cada linha do CSV.
+if sys.version_info[0] >= 3:
+    def csv_row(*cols):
+        return [u8(c) for c in cols]
+else:
+    def csv_row(*cols):
+        return [u8(c).encode("utf-8") for c in cols]
 
 
-def csv_row(*cols):
-    if sys.version_info[0] >= 3:
-        return [u8(c) for c in cols]
-    return [u8(c).encode("utf-8") for c in cols]
+# Arquivo do JSON: ensure_ascii=True garante saida ASCII, gravada em
+# streaming pelo json.dump com buffer de _IO_BUFFER bytes.
+if sys.version_info[0] >= 3:
+    def _open_json(path):
+        return open(path, "w", _IO_BUFFER, encoding="ascii", newline="")
+else:
+    def _open_json(path):
+        return open(path, "wb", _IO_BUFFER)
 
 
 def save_json(obj, *paths):
-    for path in paths:
-        try:
-            safe = normalize_json(obj)
-            blob = json.dumps(safe, indent=2, ensure_ascii=True)
-            if isinstance(blob, _unicode):
-                blob = blob.encode("utf-8")
-            with open(path, "wb") as jf:
-                jf.write(blob)
-        except Exception as ex:
-            with open(path, "wb") as jf:
-                jf.write((u'{"error": "' + u8(str(ex)) + u'"}').encode("utf-8"))
+    """
+    Normaliza uma unica vez e grava o JSON em streaming no primeiro caminho
+    (historico), sem montar a string inteira em memoria; os demais (latest)
+    recebem uma copia do arquivo pronto.
+    """
+    first = paths[0]
+    try:
+        data = normalize_json(obj)
+        with _open_json(first) as jf:
+            json.dump(data, jf, indent=2, ensure_ascii=True)
+    except Exception as ex:
+        with open(first, "wb") as jf:
+            jf.write((u'{"error": "' + u8(str(ex)) + u'"}').encode("utf-8"))
+    for path in paths[1:]:
+        shutil.copyfile(first, path)
 
 
 def rname(r):
@@ -293,22 +403,29 @@ def register(ok, categoria, descricao, detalhe=u""):
 # ============================================================
 # COLETA PRINCIPAL
 # ============================================================
+# O filtro de area (ROOM_AREA > 0) roda no collector nativo do Revit:
+# Rooms nao colocados / nao fechados nem chegam a ser empacotados no Python.
+_area_filter = ElementParameterFilter(
+    ParameterFilterRuleFactory.CreateGreaterRule(
+        ElementId(BuiltInParameter.ROOM_AREA), 0.0, 1e-9
+    )
+)
 all_rooms = [
     r for r in FilteredElementCollector(doc)
         .OfCategory(BuiltInCategory.OST_Rooms)
         .WhereElementIsNotElementType()
-        .ToElements()
-    if isinstance(r, Room) and r.Area > 0
+        .WherePasses(_area_filter)
+    if isinstance(r, Room)
 ]
 
-all_doors = list(
-    FilteredElementCollector(doc)
-    .OfCategory(BuiltInCategory.OST_Doors)
-    .WhereElementIsNotElementType()
-    .ToElements()
-)
+# Portas e paredes sao percorridas uma unica vez: os collectors sao iterados
+# direto, sem materializar listas; o total de portas vem do GetElementCount().
+all_doors = (FilteredElementCollector(doc)
+             .OfCategory(BuiltInCategory.OST_Doors)
+             .WhereElementIsNotElementType())
+n_doors   = all_doors.GetElementCount()
 
-all_walls = list(FilteredElementCollector(doc).OfClass(Wall).ToElements())
+all_walls = FilteredElementCollector(doc).OfClass(Wall)
 
 levels = sorted(
     FilteredElementCollector(doc).OfClass(Level).ToElements(),
@@ -321,6 +438,55 @@ try:
 except Exception:
     pass
 
+# Nome de cada Room lido uma unica vez (rname consulta o parametro Revit);
+# as secoes seguintes reutilizam os pares (room, nome).
+rooms_named = [(r, rname(r)) for r in all_rooms]
+
+# Pre-filtro: uma unica varredura com a uniao de KW_AMBIENTES descarta os
+# Rooms que nao casam com nenhuma lista (circulacao, deposito, etc.).
+# A regex roda por nome distinto, nao por Room: agencias repetem muito os
+# nomes (WC, CAIXA 01, ...), e o resultado vale para todos os homonimos.
+_pat_ambientes   = kw_pattern(KW_AMBIENTES)
+_nomes_cand      = set(n for n in set(n for _, n in rooms_named) if _pat_ambientes.search(n))
+rooms_candidatos = [(r, n) for r, n in rooms_named if n in _nomes_cand]
+_kw_indexadas    = frozenset(KW_AMBIENTES)
+
+_rooms_kw = {}   # tuple(keywords) -> [(room, nome)] que casam com a lista
+
+
+def rooms_matching(keywords):
+    """
+    Rooms cujo nome casa com a lista de palavras-chave. A classificacao e
+    feita uma vez por lista e reutilizada por checklist, areas e seguranca;
+    listas contidas em KW_AMBIENTES varrem apenas os rooms_candidatos.
+    """
+    key   = tuple(keywords)
+    found = _rooms_kw.get(key)
+    if found is None:
+        pat    = kw_pattern(keywords)
+        base   = rooms_candidatos if _kw_indexadas.issuperset(key) else rooms_named
+        casam  = set(n for n in set(n for _, n in base) if pat.search(n))
+        found  = _rooms_kw[key] = [(r, n) for r, n in base if n in casam]
+    return found
+
+
+def check_presence(label, keywords, categoria, required=True,
+                   ausente=u"Nao encontrado"):
+    """
+    Verificacao de presenca de ambiente, comum ao checklist (secao 3) e a
+    seguranca (secao 7): registra o resultado quando obrigatoria e devolve
+    a linha [label, qtd, amostra, status] da tabela.
+    """
+    matches = rooms_matching(keywords)
+    ok      = len(matches) > 0
+    amostra = u", ".join(n for _, n in matches[:3])
+    if required:
+        register(ok, categoria, label, amostra if ok else ausente)
+        st = status_icon(ok)
+    else:
+        st = u"OK" if ok else u"INFO"
+    return [label, str(len(matches)), amostra if ok else u"--", st]
+
 
 # ============================================================
 # 1. INFORMACOES DO PROJETO
@@ -349,10 +515,10 @@ if not all_rooms:
                     u"Verifique se os ambientes estao fechados e com area calculada.")
 else:
     inv_table = []
-    for r in sorted(all_rooms, key=lambda x: -x.Area):
+    for r, nome in sorted(rooms_named, key=lambda rn: -rn[0].Area):
         area_m2 = sqft_to_sqm(r.Area)
         link    = output.linkify(r.Id)
-        inv_table.append([rnumber(r), rname(r), u"{} m2".format(area_m2), rlevel(r), link])
+        inv_table.append([rnumber(r), nome, u"%s m2" % area_m2, rlevel(r), link])
     output.print_table(inv_table, columns=[u"Num.", u"Nome", u"Area", u"Nivel", u"Selecionar"])
     output.print_md(u"_Total: {} ambientes com area calculada_".format(len(all_rooms)))
 
@@ -362,21 +528,10 @@ else:
 # ============================================================
 output.print_md(u"---\n## 3. Checklist de Ambientes Obrigatorios")
 
-room_names  = [rname(r) for r in all_rooms]
-check_table = []
-for amb_label, kw_list in AMBIENTES_OBRIGATORIOS:
-    encontrados = [n for n in room_names if match_kw(n, kw_list)]
-    ok  = len(encontrados) > 0
-    qtd = str(len(encontrados))
-    st  = status_icon(ok)
-    register(ok, u"Ambientes Obrigatorios", amb_label,
-             u", ".join(encontrados[:3]) if encontrados else u"Nao encontrado")
-    check_table.append([
-        amb_label,
-        qtd,
-        u", ".join(encontrados[:3]) if encontrados else u"--",
-        st,
-    ])
+check_table = [
+    check_presence(amb_label, kw_list, u"Ambientes Obrigatorios")
+    for amb_label, kw_list in AMBIENTES_OBRIGATORIOS
+]
 output.print_table(check_table,
     columns=[u"Ambiente Esperado", u"Qtd", u"Encontrado(s)", u"Status"])
 
@@ -392,16 +547,34 @@ output.print_md(u"### 4a. Largura de Portas")
 porta_ok_count  = 0
 porta_nok_list  = []
 porta_total     = 0
+porta_skipped   = 0   # portas com falha inesperada de leitura na API
+
+_door_type_width = {}   # type id (int) -> parametro DOOR_WIDTH do tipo (ou None)
+porta_min_txt    = u">= %.2f m" % PORTA_ACESSIVEL_MIN_M
 
 for door in all_doors:
     try:
         w_param = door.get_Parameter(BuiltInParameter.DOOR_WIDTH)
         if w_param is None:
-            typ = doc.GetElement(door.GetTypeId())
-            w_param = typ.get_Parameter(BuiltInParameter.DOOR_WIDTH) if typ else None
+            # Largura no tipo: resolvida uma vez por tipo, nao por porta
+            type_id = door.GetTypeId()
+            key     = eid_int(type_id)
+            if key in _door_type_width:
+                w_param = _door_type_width[key]
+            else:
+                typ = doc.GetElement(type_id)
+                w_param = _door_type_width[key] = (
+                    typ.get_Parameter(BuiltInParameter.DOOR_WIDTH) if typ else None
+                )
         if w_param is None:
             continue
         largura_m = ft_to_m(w_param.AsDouble())
+        if largura_m >= PORTA_ACESSIVEL_MIN_M:
+            porta_total    += 1
+            porta_ok_count += 1
+            continue
+        # FromRoom so e consultado para as portas reprovadas (pode lancar
+        # quando a porta nao tem ambiente na fase corrente)
         room_name = u""
         try:
             fr = door.FromRoom
@@ -409,23 +582,23 @@ for door in all_doors:
                 room_name = u8(fr.Name)
         except Exception:
             pass
-        ok = largura_m >= PORTA_ACESSIVEL_MIN_M
+        # Linha montada antes de contar: uma falha aqui nao deixa a porta
+        # no total sem estar na lista de pendencias.
+        door_name = u8(door.Name)
+        row = [
+            door_name, room_name,
+            u"%.3f m" % largura_m,
+            porta_min_txt,
+            status_icon(False),
+            output.linkify(door.Id),
+        ]
         porta_total += 1
-        if ok:
-            porta_ok_count += 1
-        else:
-            porta_nok_list.append([
-                u8(door.Name), room_name,
-                u"{:.3f} m".format(largura_m),
-                u">= {:.2f} m".format(PORTA_ACESSIVEL_MIN_M),
-                status_icon(ok),
-                output.linkify(door.Id),
-            ])
-            register(False, u"Acessibilidade",
-                     u"Porta abaixo da largura minima",
-                     u"{} ({:.3f} m)".format(u8(door.Name), largura_m))
+        porta_nok_list.append(row)
+        register(False, u"Acessibilidade",
+                 u"Porta abaixo da largura minima",
+                 u"%s (%.3f m)" % (door_name, largura_m))
     except Exception:
-        pass
+        porta_skipped += 1
 
 if porta_nok_list:
     output.print_table(porta_nok_list,
@@ -438,6 +611,8 @@ else:
             porta_total, PORTA_ACESSIVEL_MIN_M))
     else:
         output.print_md(u"> _Nenhuma porta com parametro de largura encontrada._")
+if porta_skipped:
+    output.print_md(u"> _{} porta(s) ignorada(s) por erro de leitura._".format(porta_skipped))
 
 register(len(porta_nok_list) == 0, u"Acessibilidade",
          u"Todas as portas >= {:.2f} m".format(PORTA_ACESSIVEL_MIN_M),
@@ -446,22 +621,25 @@ register(len(porta_nok_list) == 0, u"Acessibilidade",
 # 4b. Banheiros acessiveis
 output.print_md(u"### 4b. Banheiros Acessiveis")
 
-banheiros  = [r for r in all_rooms if match_kw(rname(r), KW_BANHEIRO)]
-ban_acess  = [r for r in banheiros if match_kw(rname(r), KW_ACESSIVEL)]
+banheiros  = rooms_matching(KW_BANHEIRO)
+ban_acess  = []
 ban_table  = []
-for r in banheiros:
+ban_min_txt = u"Banheiro abaixo de %.2f m2" % AREA_MIN_BANHEIRO_M2
+for r, nome in banheiros:
     area_m2  = sqft_to_sqm(r.Area)
-    eh_acess = match_kw(rname(r), KW_ACESSIVEL)
+    eh_acess = PAT_ACESSIVEL.search(nome) is not None
     ok_area  = area_m2 >= AREA_MIN_BANHEIRO_M2
+    if eh_acess:
+        ban_acess.append(r)
     ban_table.append([
-        rname(r), u"{} m2".format(area_m2),
+        nome, u"%s m2" % area_m2,
         u"Sim" if eh_acess else u"Nao",
         status_icon(ok_area), output.linkify(r.Id),
     ])
     if not ok_area:
         register(False, u"Acessibilidade",
-                 u"Banheiro abaixo de {:.2f} m2".format(AREA_MIN_BANHEIRO_M2),
-                 u"{} = {:.2f} m2".format(rname(r), area_m2))
+                 ban_min_txt,
+                 u"%s = %.2f m2" % (nome, area_m2))
 
 if ban_table:
     output.print_table(ban_table,
@@ -491,20 +669,20 @@ AREA_REGRAS = [
 
 area_table = []
 for label, kws, min_m2 in AREA_REGRAS:
-    ambientes_match = [r for r in all_rooms if match_kw(rname(r), kws)]
+    ambientes_match = rooms_matching(kws)
     if not ambientes_match:
-        area_table.append([label, u"--", u"Nao encontrado", u">= {} m2".format(min_m2), u"PENDENTE"])
+        area_table.append([label, u"--", u"Nao encontrado", u">= %s m2" % min_m2, u"PENDENTE"])
         register(False, u"Areas Minimas", label + u" nao encontrado no modelo", u"")
         continue
-    for r in ambientes_match:
+    for r, nome in ambientes_match:
         area_m2 = sqft_to_sqm(r.Area)
         ok      = area_m2 >= min_m2
-        area_table.append([label, rname(r), u"{} m2".format(area_m2), u">= {} m2".format(min_m2), status_icon(ok)])
+        area_table.append([label, nome, u"%s m2" % area_m2, u">= %s m2" % min_m2, status_icon(ok)])
         if not ok:
-            register(False, u"Areas Minimas", u"{} abaixo do minimo".format(label),
-                     u"{} = {:.2f} m2 (min: {:.2f} m2)".format(rname(r), area_m2, min_m2))
+            register(False, u"Areas Minimas", u"%s abaixo do minimo" % label,
+                     u"%s = %.2f m2 (min: %.2f m2)" % (nome, area_m2, min_m2))
         else:
-            register(True, u"Areas Minimas", u"{} em conformidade".format(label))
+            register(True, u"Areas Minimas", u"%s em conformidade" % label)
 
 output.print_table(area_table,
     columns=[u"Tipo Esperado", u"Room", u"Area Real", u"Minimo", u"Status"])
@@ -515,8 +693,18 @@ output.print_table(area_table,
 # ============================================================
 output.print_md(u"---\n## 6. Pe-Direito por Ambiente")
 
-pd_table = []
-for r in all_rooms:
+# Classificacao e agregacao numa passada: so as pendencias viram linha de
+# tabela (com linkify); os conformes entram apenas na contagem.
+pd_total   = 0
+pd_ok      = 0
+nok_pd     = []
+pd_skipped = 0   # ambientes com falha inesperada de leitura na API
+
+# Nomes de hall/caixas vem do indice de Rooms (so os candidatos sao
+# varridos); no loop, um teste de pertinencia substitui a regex por Room.
+nomes_hall = set(n for _, n in rooms_matching(KW_PE_DIREITO_HALL))
+
+for r, nome in rooms_named:
     try:
         h_param = r.get_Parameter(BuiltInParameter.ROOM_HEIGHT)
         if h_param is None:
@@ -524,33 +712,37 @@ for r in all_rooms:
         altura_m = ft_to_m(h_param.AsDouble())
         if altura_m <= 0:
             continue
-        if match_kw(rname(r), KW_ESPERA + KW_CAIXA):
+        if nome in nomes_hall:
             minimo = PE_DIREITO_HALL_MIN_M
         else:
             minimo = PE_DIREITO_MIN_M
-        ok = altura_m >= minimo
-        pd_table.append([
-            rname(r), u"{:.3f} m".format(altura_m),
-            u">= {:.2f} m".format(minimo), status_icon(ok), output.linkify(r.Id),
-        ])
-        if not ok:
-            register(False, u"Pe-Direito", u"Pe-direito abaixo do minimo",
-                     u"{}: {:.3f} m (min {:.2f} m)".format(rname(r), altura_m, minimo))
+        if altura_m >= minimo:
+            pd_total += 1
+            pd_ok    += 1
+            continue
+        row = [
+            nome, u"%.3f m" % altura_m,
+            u">= %.2f m" % minimo, status_icon(False), output.linkify(r.Id),
+        ]
+        pd_total += 1
+        nok_pd.append(row)
+        register(False, u"Pe-Direito", u"Pe-direito abaixo do minimo",
+                 u"%s: %.3f m (min %.2f m)" % (nome, altura_m, minimo))
     except Exception:
-        pass
+        pd_skipped += 1
 
-if pd_table:
-    nok_pd = [row for row in pd_table if row[3] == u"ATENCAO"]
-    ok_pd  = [row for row in pd_table if row[3] == u"OK"]
+if pd_total:
     if nok_pd:
         output.print_table(nok_pd,
             columns=[u"Ambiente", u"Altura", u"Minimo", u"Status", u"Selecionar"])
     output.print_md(u"> {}/{} ambientes com pe-direito em conformidade".format(
-        len(ok_pd), len(pd_table)))
+        pd_ok, pd_total))
     if not nok_pd:
         output.print_md(u"> Todos os ambientes atendem o pe-direito minimo.")
 else:
     output.print_md(u"> _Nenhum ambiente com parametro de altura encontrado._")
+if pd_skipped:
+    output.print_md(u"> _{} ambiente(s) ignorado(s) por erro de leitura._".format(pd_skipped))
 
 
 # ============================================================
@@ -558,23 +750,19 @@ else:
 # ============================================================
 output.print_md(u"---\n## 7. Seguranca -- Elementos Criticos")
 
-seg_table = []
-
-def check_security_zone(label, keywords, required=True):
-    matches = [r for r in all_rooms if match_kw(rname(r), keywords)]
-    ok    = len(matches) > 0
-    qtd   = str(len(matches))
-    nomes = u", ".join(rname(r) for r in matches[:3])
-    st    = status_icon(ok) if required else (u"OK" if ok else u"INFO")
-    if required:
-        register(ok, u"Seguranca", label, nomes if ok else u"Nao encontrado no modelo")
-    seg_table.append([label, qtd, nomes if ok else u"--", st])
+SEGURANCA_ZONAS = [
+    (u"Cabine / Cilindro de Seguranca",  KW_SEGURANCA, True),
+    (u"Cofre / Sala-Forte",              KW_COFRE,     True),
+    (u"Saida de Emergencia / Rota Fuga", KW_SAIDA,     True),
+    (u"Area de Autoatendimento (ATM)",   KW_ATM,       True),
+    (u"Sala de TI / Servidores",         KW_TI,        False),
+]
 
-check_security_zone(u"Cabine / Cilindro de Seguranca", KW_SEGURANCA, required=True)
-check_security_zone(u"Cofre / Sala-Forte",             KW_COFRE,     required=True)
-check_security_zone(u"Saida de Emergencia / Rota Fuga",KW_SAIDA,     required=True)
-check_security_zone(u"Area de Autoatendimento (ATM)",   KW_ATM,       required=True)
-check_security_zone(u"Sala de TI / Servidores",         KW_TI,        required=False)
+seg_table = [
+    check_presence(label, keywords, u"Seguranca", required,
+                   ausente=u"Nao encontrado no modelo")
+    for label, keywords, required in SEGURANCA_ZONAS
+]
 
 output.print_table(seg_table,
     columns=[u"Elemento de Seguranca", u"Qtd", u"Ambiente(s)", u"Status"])
@@ -582,27 +770,32 @@ output.print_table(seg_table,
 # Paredes especiais (blindagem / corta-fogo)
 output.print_md(u"### 7a. Paredes Especiais (Blindagem / Seguranca)")
 
-paredes_seg = []
-for w in all_walls:
-    try:
-        nome_tipo = u""
-        typ = doc.GetElement(w.GetTypeId())
-        if typ:
-            nome_tipo = u8(typ.Name)
-        if any(kw in nome_tipo.upper() for kw in
-               [u"BLIND", u"SEGUR", u"CORTA-FOGO", u"CORTA FOGO", u"FIRE", u"REFOR"]):
-            paredes_seg.append([nome_tipo, output.linkify(w.Id)])
-    except Exception:
-        pass
-
-if paredes_seg:
-    output.print_table(paredes_seg, columns=[u"Tipo de Parede", u"Selecionar"])
-    output.print_md(u"_Total: {} parede(s) especial(is) identificada(s)_".format(len(paredes_seg)))
+if not VERIFICAR_PAREDES_ESPECIAIS:
+    output.print_md(u"> _Verificacao desativada (VERIFICAR_PAREDES_ESPECIAIS = False)._")
 else:
-    output.print_md(
-        u"> _Nenhuma parede com nomenclatura de blindagem/corta-fogo encontrada. "
-        u"Verifique os tipos de parede do projeto._"
-    )
+    # A classificacao e feita por WallType (dezenas), nao por parede (milhares):
+    # o loop de instancias faz so um lookup de inteiro, sem doc.GetElement.
+    paredes_tipo = {}   # type id (int) -> nome do tipo especial
+    for wt in FilteredElementCollector(doc).OfClass(WallType):
+        nome_tipo = u8(wt.Name)
+        if PAT_PAREDE_ESPECIAL.search(nome_tipo):
+            paredes_tipo[eid_int(wt.Id)] = nome_tipo
+
+    paredes_seg = []
+    if paredes_tipo:
+        for w in all_walls:
+            nome_tipo = paredes_tipo.get(eid_int(w.GetTypeId()))
+            if nome_tipo is not None:
+                paredes_seg.append([nome_tipo, output.linkify(w.Id)])
+
+    if paredes_seg:
+        output.print_table(paredes_seg, columns=[u"Tipo de Parede", u"Selecionar"])
+        output.print_md(u"_Total: {} parede(s) especial(is) identificada(s)_".format(len(paredes_seg)))
+    else:
+        output.print_md(
+            u"> _Nenhuma parede com nomenclatura de blindagem/corta-fogo encontrada. "
+            u"Verifique os tipos de parede do projeto._"
+        )
 
 
 # ============================================================
@@ -610,9 +803,12 @@ else:
 # ============================================================
 output.print_md(u"---\n## 8. Nomenclatura dos Ambientes")
 
-sem_nome   = [r for r in all_rooms if not rname(r).strip()]
+sem_nome   = [r for r, n in rooms_named if not n.strip()]
 sem_numero = [r for r in all_rooms if not rnumber(r).strip()]
-duplicados = [name for name, cnt in Counter(rname(r) for r in all_rooms).items() if cnt > 1]
+name_count = {}
+for _, n in rooms_named:
+    name_count[n] = name_count.get(n, 0) + 1
+duplicados = [name for name, cnt in name_count.items() if cnt > 1]
 
 output.print_table([
     [u"Rooms sem nome",    str(len(sem_nome)),   status_icon(len(sem_nome) == 0)],
@@ -628,7 +824,7 @@ if sem_nome:
     output.print_table([[output.linkify(r.Id), u8(r.Number)] for r in sem_nome[:10]],
         columns=[u"Selecionar", u"Numero Room"])
 if duplicados:
-    output.print_md(u"**Nomes duplicados:** " + u", ".join(u"`{}`".format(d) for d in duplicados))
+    output.print_md(u"**Nomes duplicados:** " + u", ".join(u"`%s`" % d for d in duplicados))
 
 
 
@@ -638,18 +834,20 @@ if duplicados:
 output.print_md(u"---\n## 9. Alertas do Modelo (Warnings)")
 
 if model_warnings:
-    warn_counter = Counter()
+    # dict + get() em vez de Counter: no IronPython o Counter e uma
+    # subclasse Python pura de dict, com custo extra por incremento.
+    warn_count = {}
     for w in model_warnings:
         try:
             desc = u8(str(w.GetDescriptionText()))[:100]
         except Exception:
             desc = u"(erro ao ler descricao)"
-        warn_counter[desc] += 1
+        warn_count[desc] = warn_count.get(desc, 0) + 1
 
     total_warn = len(model_warnings)
     output.print_table([
-        [u8(desc), str(cnt), u"{:.1f}%".format(cnt * 100.0 / total_warn)]
-        for desc, cnt in warn_counter.most_common(15)
+        [u8(desc), str(cnt), u"%.1f%%" % (cnt * 100.0 / total_warn)]
+        for desc, cnt in sorted(warn_count.items(), key=lambda kv: -kv[1])[:15]
     ], columns=[u"Descricao", u"Ocorrencias", u"%"])
     output.print_md(u"_Total: {} alertas no modelo_".format(total_warn))
     register(total_warn == 0, u"Alertas", u"Modelo sem warnings", str(total_warn))
@@ -692,17 +890,19 @@ if pendencias:
 # ============================================================
 # EXPORTACAO CSV
 # ============================================================
-for path in [
+# Linhas montadas uma unica vez; historico e latest recebem a mesma lista.
+# run_stamp e model sao constantes: convertidos uma unica vez, fora do loop.
+const_cols = csv_row(run_stamp, model)
+val_rows   = [csv_row("run_stamp", "model", "categoria", "descricao", "detalhe", "status")]
+val_rows.extend(
+    const_cols + csv_row(p["categoria"], p["descricao"], p["detalhe"], p["status"])
+    for p in pendencias
+)
+save_csv(
+    val_rows,
     os.path.join(RUN_DIR,    "relatorio_validacao.csv"),
     os.path.join(LATEST_DIR, "relatorio_validacao.csv"),
-]:
-    f = write_bom_csv(path)
-    w = csv.writer(f)
-    w.writerow(csv_row("run_stamp", "model", "categoria", "descricao", "detalhe", "status"))
-    for p in pendencias:
-        w.writerow(csv_row(run_stamp, model,
-                           p["categoria"], p["descricao"], p["detalhe"], p["status"]))
-    f.close()
+)
 
 
 # ============================================================
@@ -728,15 +928,15 @@ resultado = {
         "score_pct":    score_pct,
         "nivel":        nivel,
     },
-    "pendencias": normalize_json(pendencias),
+    "pendencias": pendencias,
     "inventario": [
         {
             "number":  rnumber(r),
-            "name":    rname(r),
+            "name":    nome,
             "area_m2": sqft_to_sqm(r.Area),
             "level":   rlevel(r),
         }
-        for r in all_rooms
+        for r, nome in rooms_named
     ],
 }
 save_json(
@@ -760,21 +960,25 @@ output.print_md(u"> **Arquivos:** `relatorio_validacao.csv` | `validacao_agencia
 # ============================================================
 # CONSOLE
 # ============================================================
-print("=" * 65)
-print("  VALIDADOR DE LAYOUT -- AGENCIA BANCARIA")
-print("=" * 65)
-print("  Modelo     : {}".format(model))
-print("  Revit      : {} ({})".format(app.VersionNumber, app.VersionName))
-print("  Score      : {}% -- {}".format(score_pct, nivel))
-print("-" * 65)
-print("  Checks     : {}".format(total_checks))
-print("  Aprovados  : {}".format(passed_checks))
-print("  Pendencias : {}".format(total_checks - passed_checks))
-print("  Rooms      : {}".format(len(all_rooms)))
-print("  Portas     : {}".format(len(all_doors)))
-print("  Alertas    : {}".format(len(model_warnings)))
-print("-" * 65)
-print("  [Historico] {}".format(RUN_DIR))
-print("  [Latest]    {}".format(LATEST_DIR))
-print("=" * 65)
-print("PROCESSO REALIZADO COM SUCESSO")
\ No newline at end of file
+# Uma unica escrita no stdout em vez de um print por linha.
+console_lines = [
+    "=" * 65,
+    "  VALIDADOR DE LAYOUT -- AGENCIA BANCARIA",
+    "=" * 65,
+    "  Modelo     : {}".format(model),
+    "  Revit      : {} ({})".format(app.VersionNumber, app.VersionName),
+    "  Score      : {}% -- {}".format(score_pct, nivel),
+    "-" * 65,
+    "  Checks     : {}".format(total_checks),
+    "  Aprovados  : {}".format(passed_checks),
+    "  Pendencias : {}".format(total_checks - passed_checks),
+    "  Rooms      : {}".format(len(all_rooms)),
+    "  Portas     : {}".format(n_doors),
+    "  Alertas    : {}".format(len(model_warnings)),
+    "-" * 65,
+    "  [Historico] {}".format(RUN_DIR),
+    "  [Latest]    {}".format(LATEST_DIR),
+    "=" * 65,
+    "PROCESSO REALIZADO COM SUCESSO",
+]
+sys.stdout.write("\n".join(console_lines) + "\n")
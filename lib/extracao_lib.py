@@ -24,16 +24,34 @@ Compatível com Revit 2022-2026  |  IronPython 2 / CPython 3
 """
 
 from Autodesk.Revit.DB import (
+    BuiltInCategory,
     FilteredElementCollector,
+    ElementMulticategoryFilter,
     ElementId,
     LocationPoint,
     LocationCurve,
     StorageType,
+    View,
     ViewSheet,
+    Viewport,
 )
+from System.Collections.Generic import List
 
 from collections import defaultdict, Counter
+from operator import itemgetter
 import os, csv, json, sys
+import shutil
+import threading
+
+try:
+    from cStringIO import StringIO   # IronPython 2: buffer de bytes
+except ImportError:
+    from io import StringIO          # CPython 3: buffer de texto
+
+try:
+    from Queue import Queue          # IronPython 2
+except ImportError:
+    from queue import Queue          # CPython 3
 
 from path_utils import (
     BASE_DIR,
@@ -41,6 +59,7 @@ from path_utils import (
     u8,
     safe_str,
     write_bom_csv,
+    save_bom_csv,
     write_json_file,
     ensure_dirs as make_dirs,
 )
@@ -53,8 +72,33 @@ MAX_PARAM_LEN    = 500
 # Quando True, emite parâmetros do TIPO de cada elemento no JSON completo.
 INCLUDE_TYPE_PARAMS_IN_JSON = True
 
+# Quando True, collect_params lê GetOrderedParameters() — só os parâmetros
+# exibidos na paleta Propriedades, sem montar um ParameterSet por elemento.
+# Mais rápido, mas parâmetros ocultos/internos somem do params.csv e do
+# instance_params/type_params do JSON; por isso fica desligado por padrão
+# e a exportação continua com todos os parâmetros (el.Parameters).
+ONLY_VISIBLE_PARAMS = False
+
+# Quando False, extrair_completo não calcula a bounding box (get_BoundingBox
+# processa a geometria do elemento) e as colunas bbox_min/bbox_max saem vazias.
+INCLUDE_BBOX = True
+
+# Quantos elementos formam cada lote entregue à thread de escrita CSV.
+FLUSH_EVERY = 1000
+
+# Quando True, param_to_str devolve primeiro p.AsValueString() — o texto que
+# o Revit mostra, já nas unidades do projeto — e só cai na conversão por
+# StorageType quando ele vem vazio. Poupa a formatação de Double e o
+# doc.GetElement de ElementId, mas os números deixam de sair crus (pés
+# internos com 6 casas); por isso fica desligado por padrão.
+PARAM_AS_VALUE_STRING = False
+
+# Propriedade estática .NET: resolvida uma vez aqui, não a cada chamada
+# dos helpers abaixo (get_level_name, get_phase_names, param_to_str).
+_INVALID_EID = ElementId.InvalidElementId
+
 # Categorias monitoradas pelo inventário por folha.
-CATEGORIAS_INCLUIR = set([
+CATEGORIAS_INCLUIR = frozenset([
     u"Luminarias",
     u"Dispositivos eletricos",
     u"Equipamentos eletricos",
@@ -74,18 +118,88 @@ CATEGORIAS_INCLUIR = set([
 ])
 
 
-def eid_int(eid):
-    """Extrai o valor inteiro de um ElementId (compatível com Revit < e >= 2024)."""
+# u8 memorizado para colunas muito repetidas (categoria, família, tipo, nível,
+# nome do parâmetro...): poucas centenas de valores distintos por modelo.
+# Não usar em valores únicos (UniqueId, Id) — só encheriam o cache.
+_u8_cache     = {}
+_U8_CACHE_MAX = 4096
+
+
+def _u8_rep(x):
     try:
+        return _u8_cache[x]
+    except KeyError:
+        v = u8(x)
+        if len(_u8_cache) < _U8_CACHE_MAX:
+            _u8_cache[x] = v
+        return v
+
+
+# Revit 2024+ expõe ElementId.Value (Int64) e descontinua IntegerValue. A
+# propriedade é escolhida uma vez, no import, e não testada a cada chamada:
+# no 2024+ o IntegerValue lançaria exceção (cara no IronPython) em todo Id.
+if hasattr(ElementId, "Value"):
+    def eid_int(eid):
+        """Extrai o valor inteiro de um ElementId (compatível com Revit < e >= 2024)."""
+        if eid is None:
+            return None
+        return int(eid.Value)
+else:
+    def eid_int(eid):
+        """Extrai o valor inteiro de um ElementId (compatível com Revit < e >= 2024)."""
+        if eid is None:
+            return None
         return int(eid.IntegerValue)
+
+
+# Cache de módulo: o extracao_lib fica carregado entre cliques nos botões,
+# então a resolução nome → Id das categorias não é refeita a cada execução.
+_cat_incluir_cache = {}   # idioma do Revit → {Category.Id (int): nome}
+
+
+def _categorias_incluir(doc):
+    """
+    Resolve CATEGORIAS_INCLUIR (nomes localizados) para Ids inteiros.
+    Categorias nativas têm Id fixo (BuiltInCategory, negativo) e o nome só
+    depende do idioma do Revit: o resultado é memorizado por idioma. Se
+    alguma categoria do documento (Id positivo) casar, nada é memorizado.
+    """
+    try:
+        lang = str(doc.Application.Language)
     except:
+        lang = None
+    ids = _cat_incluir_cache.get(lang)
+    if ids is not None:
+        return ids
+    ids = {}
+    for c in doc.Settings.Categories:
         try:
-            return int(eid.Value)
+            nome_cat = c.Name or u""
+            if nome_cat in CATEGORIAS_INCLUIR:
+                ids[eid_int(c.Id)] = nome_cat
         except:
-            try:
-                return int(eid.ToString())
-            except:
-                return None
+            continue
+    if lang is not None and all(cid is not None and cid < 0 for cid in ids):
+        _cat_incluir_cache[lang] = ids
+    return ids
+
+
+# Categorias sem geometria no modelo: get_BoundingBox (que calcula geometria)
+# devolve null ou lixo para elas e não é chamado. Ids inteiros (negativos).
+_BBOX_SKIP_CATEGORIES = set(
+    eid_int(ElementId(bic)) for bic in (
+        BuiltInCategory.OST_ProjectInformation,
+        BuiltInCategory.OST_Materials,
+        BuiltInCategory.OST_Views,
+        BuiltInCategory.OST_Sheets,
+        BuiltInCategory.OST_Schedules,
+    )
+)
+
+
+# Formatos de coordenadas (4 casas), compartilhados pelos helpers abaixo.
+_FMT_XYZ   = "%.4f,%.4f,%.4f"
+_FMT_CURVE = _FMT_XYZ + " -> " + _FMT_XYZ
 
 
 def bbox_to_dict(bb):
@@ -97,50 +211,76 @@ def bbox_to_dict(bb):
         return {"min": "", "max": ""}
     mn, mx = bb.Min, bb.Max
     return {
-        "min": "{:.4f},{:.4f},{:.4f}".format(mn.X, mn.Y, mn.Z),
-        "max": "{:.4f},{:.4f},{:.4f}".format(mx.X, mx.Y, mx.Z),
+        "min": _FMT_XYZ % (mn.X, mn.Y, mn.Z),
+        "max": _FMT_XYZ % (mx.X, mx.Y, mx.Z),
     }
 
 
+def _loc_point(loc):
+    p = loc.Point
+    return {"kind": "POINT", "value": _FMT_XYZ % (p.X, p.Y, p.Z)}
+
+
+def _loc_curve(loc):
+    # Curvas sem limites (unbound) lançam exceção em GetEndPoint.
+    c  = loc.Curve
+    p0 = c.GetEndPoint(0)
+    p1 = c.GetEndPoint(1)
+    return {
+        "kind":  "CURVE",
+        "value": _FMT_CURVE % (p0.X, p0.Y, p0.Z, p1.X, p1.Y, p1.Z),
+    }
+
+
+# Tipo exato de Location → conversor. LocationPoint/LocationCurve não têm
+# subclasses na API do Revit: um lookup por type(loc) substitui os testes.
+_LOC_HANDLERS = {
+    LocationPoint: _loc_point,
+    LocationCurve: _loc_curve,
+}
+
+
 def location_to_dict(el):
     """
     Extrai localização geométrica do elemento.
     - LocationPoint → kind='POINT', value='X,Y,Z'
     - LocationCurve → kind='CURVE', value='X0,Y0,Z0 -> X1,Y1,Z1'
     """
-    loc = el.Location
-    if not loc:
-        return {"kind": "", "value": ""}
-    if isinstance(loc, LocationPoint):
-        p = loc.Point
-        return {
-            "kind":  "POINT",
-            "value": "{:.4f},{:.4f},{:.4f}".format(p.X, p.Y, p.Z),
-        }
-    if isinstance(loc, LocationCurve):
-        c  = loc.Curve
-        p0 = c.GetEndPoint(0)
-        p1 = c.GetEndPoint(1)
-        return {
-            "kind":  "CURVE",
-            "value": "{:.4f},{:.4f},{:.4f} -> {:.4f},{:.4f},{:.4f}".format(
-                p0.X, p0.Y, p0.Z, p1.X, p1.Y, p1.Z),
-        }
+    try:
+        loc = el.Location
+        if loc:
+            handler = _LOC_HANDLERS.get(type(loc))
+            if handler is not None:
+                return handler(loc)
+    except:
+        pass
     return {"kind": "", "value": ""}
 
 
-def get_level_name(el):
+# Os get_* abaixo aceitam um dict "cache" opcional (Id inteiro → resultado).
+# Níveis, worksets e tipos se repetem em milhares de elementos; o chamador
+# cria um dict por execução (os Ids só valem dentro de um documento).
+
+def get_level_name(el, cache=None):
     """Retorna o nome do nível (pavimento) ao qual o elemento pertence."""
     try:
-        if el.LevelId and el.LevelId != ElementId.InvalidElementId:
-            lv = el.Document.GetElement(el.LevelId)
-            return lv.Name if lv else ""
+        lid = el.LevelId
+        if lid and lid != _INVALID_EID:
+            if cache is None:
+                lv = el.Document.GetElement(lid)
+                return lv.Name if lv else ""
+            key  = eid_int(lid)
+            name = cache.get(key)
+            if name is None:
+                lv   = el.Document.GetElement(lid)
+                name = cache[key] = lv.Name if lv else ""
+            return name
     except:
         pass
     return ""
 
 
-def get_family_type(el):
+def get_family_type(el, cache=None):
     """
     Retorna (FamilyName, TypeName) do elemento.
     FamilyName = geometria/comportamento (ex: "Luminária Embutida Quadrada")
@@ -149,7 +289,13 @@ def get_family_type(el):
     fam = u""
     typ = u""
     try:
-        t = el.Document.GetElement(el.GetTypeId())
+        tid = el.GetTypeId()
+        if cache is not None:
+            key = eid_int(tid)
+            ft  = cache.get(key)
+            if ft is not None:
+                return ft
+        t = el.Document.GetElement(tid)
         if t:
             try:
                 fam = t.FamilyName or u""
@@ -159,18 +305,32 @@ def get_family_type(el):
                 typ = t.Name or u""
             except:
                 pass
+        if cache is not None:
+            cache[key] = (fam, typ)
     except:
         pass
     return fam, typ
 
 
-def get_workset_name(el):
-    """Retorna o nome do Workset do elemento ('' em projetos sem worksets)."""
+def get_workset_name(el, cache=None, ws_table=None):
+    """
+    Retorna o nome do Workset do elemento ('' em projetos sem worksets).
+    ws_table: WorksetTable do documento, obtida uma vez pelo chamador.
+    """
     try:
-        ws_table = el.Document.GetWorksetTable()
-        ws_id    = el.WorksetId
+        ws_id = el.WorksetId
+        if cache is not None:
+            key  = ws_id.IntegerValue
+            name = cache.get(key)
+            if name is not None:
+                return name
+        if ws_table is None:
+            ws_table = el.Document.GetWorksetTable()
         ws       = ws_table.GetWorkset(ws_id)
-        return ws.Name if ws else ""
+        name     = ws.Name if ws else ""
+        if cache is not None:
+            cache[key] = name
+        return name
     except:
         return ""
 
@@ -180,13 +340,30 @@ def get_phase_names(el):
     try:
         pc = el.CreatedPhaseId
         pd = el.DemolishedPhaseId
-        phase_c = el.Document.GetElement(pc).Name if pc != ElementId.InvalidElementId else ""
-        phase_d = el.Document.GetElement(pd).Name if pd != ElementId.InvalidElementId else ""
+        phase_c = el.Document.GetElement(pc).Name if pc != _INVALID_EID else ""
+        phase_d = el.Document.GetElement(pd).Name if pd != _INVALID_EID else ""
         return (phase_c, phase_d)
     except:
         return ("", "")
 
 
+def _first_param_value(owner, param_names, doc):
+    """
+    Primeiro valor não vazio entre os parâmetros param_names de owner.
+    LookupParameter por nome da lista — nunca percorre todos os parâmetros.
+    """
+    for pname in param_names:
+        try:
+            p = owner.LookupParameter(pname)
+            if p:
+                val = param_to_str(p, doc)
+                if val:
+                    return val
+        except:
+            pass
+    return u""
+
+
 def get_room_name(el, doc, param_names=None):
     """
     Retorna o nome do ambiente (Room/Space) onde o elemento está.
@@ -221,25 +398,18 @@ def get_room_name(el, doc, param_names=None):
                 u"Compartimento", u"Room Name",
                 u"Nome do Compartimento", u"Room", u"Ambiente",
             ]
-    for pname in param_names:
-        try:
-            p = el.LookupParameter(pname)
-            if p:
-                val = param_to_str(p, doc)
-                if val:
-                    return val
-        except:
-            pass
-    return u""
+    return _first_param_value(el, param_names, doc)
 
 
-def get_sap_code(el, doc, param_names=None):
+def get_sap_code(el, doc, param_names=None, type_cache=None):
     """
     Busca o Código SAP na instância e, se não encontrar, no tipo.
 
     param_names : lista de nomes de parâmetro a tentar (em ordem).
                   Se None, carrega SAP_PARAMETER_NAMES de config_inventario;
                   se o módulo não existir usa defaults internos.
+    type_cache  : dict opcional TypeId (int) → código do tipo. Instâncias
+                  do mesmo tipo reaproveitam a busca feita no tipo.
     Retorna string vazia se ausente.
     """
     if param_names is None:
@@ -252,31 +422,27 @@ def get_sap_code(el, doc, param_names=None):
                 u"Cod SAP", u"Codigo_SAP", u"Código_SAP",
             ]
     # Tentativa na instância
-    for pname in param_names:
-        try:
-            p = el.LookupParameter(pname)
-            if p:
-                val = param_to_str(p, doc)
-                if val:
-                    return val
-        except:
-            pass
+    val = _first_param_value(el, param_names, doc)
+    if val:
+        return val
     # Tentativa no tipo
     try:
-        t = doc.GetElement(el.GetTypeId())
+        tid = el.GetTypeId()
+    except:
+        return u""
+    key = eid_int(tid) if type_cache is not None else None
+    if key is not None and key in type_cache:
+        return type_cache[key]
+    val = u""
+    try:
+        t = doc.GetElement(tid)
         if t:
-            for pname in param_names:
-                try:
-                    p = t.LookupParameter(pname)
-                    if p:
-                        val = param_to_str(p, doc)
-                        if val:
-                            return val
-                except:
-                    pass
+            val = _first_param_value(t, param_names, doc)
     except:
         pass
-    return u""
+    if key is not None:
+        type_cache[key] = val
+    return val
 
 
 def get_design_option(el):
@@ -290,45 +456,91 @@ def get_design_option(el):
         return ""
 
 
+def _st_string(p, doc):
+    return p.AsString() or ""
+
+
+def _st_integer(p, doc):
+    return str(p.AsInteger())
+
+
+def _st_double(p, doc):
+    return "%.6f" % p.AsDouble()
+
+
+def _st_element_id(p, doc):
+    eid = p.AsElementId()
+    if eid == _INVALID_EID:
+        return ""
+    if doc:
+        ref = doc.GetElement(eid)
+        if ref:
+            try:
+                return "%s:%s" % (eid_int(eid), ref.Name)
+            except:
+                return str(eid_int(eid))
+    return str(eid_int(eid))
+
+
+# StorageType → conversor. StorageType.None (e qualquer outro) não tem
+# entrada e resulta em "".
+_ST_HANDLERS = {
+    StorageType.String:    _st_string,
+    StorageType.Integer:   _st_integer,
+    StorageType.Double:    _st_double,
+    StorageType.ElementId: _st_element_id,
+}
+
+
 def param_to_str(p, doc=None):
     """
     Converte o valor de um parâmetro Revit para string.
     Tipos: String, Integer, Double, ElementId.
     Para ElementId tenta resolver o nome do elemento referenciado.
+    Com PARAM_AS_VALUE_STRING, usa o texto de exibição do Revit quando houver.
     """
-    st = p.StorageType
+    if PARAM_AS_VALUE_STRING:
+        try:
+            s = p.AsValueString()
+            if s:
+                return s
+        except:
+            pass
+    handler = _ST_HANDLERS.get(p.StorageType)
+    if handler is None:
+        return ""
     try:
-        if st == StorageType.String:
-            return p.AsString() or ""
-        if st == StorageType.Integer:
-            return str(p.AsInteger())
-        if st == StorageType.Double:
-            return "{:.6f}".format(p.AsDouble())
-        if st == StorageType.ElementId:
-            eid = p.AsElementId()
-            if eid == ElementId.InvalidElementId:
-                return ""
-            if doc:
-                ref = doc.GetElement(eid)
-                if ref:
-                    try:
-                        return "{}:{}".format(eid_int(eid), ref.Name)
-                    except:
-                        return str(eid_int(eid))
-            return str(eid_int(eid))
+        return handler(p, doc)
     except:
         return ""
-    return ""
+
+
+# (name, value) de cada dict de collect_params: dict(map(_name_value, params))
+# monta o {nome: valor} do JSON num laço interno, sem comprehension.
+_name_value = itemgetter("name", "value")
 
 
 def collect_params(el, max_len=MAX_PARAM_LEN, doc=None):
     """
-    Coleta todos os parâmetros de um elemento (instância ou tipo).
+    Coleta os parâmetros de um elemento (instância ou tipo).
     Retorna lista de dicts: {name, storage_type, value, is_shared, guid, group}.
     Parâmetros com valor vazio são descartados.
+
+    Por padrão lê todos os parâmetros (el.Parameters). Com
+    ONLY_VISIBLE_PARAMS usa GetOrderedParameters() — IList direto, sem o
+    ParameterSet novo a cada acesso, mas apenas os parâmetros visíveis na
+    paleta Propriedades (ocultos/internos ficam de fora).
     """
+    params = None
+    if ONLY_VISIBLE_PARAMS:
+        try:
+            params = el.GetOrderedParameters()
+        except:
+            pass
+    if params is None:
+        params = el.Parameters
     result = []
-    for p in el.Parameters:
+    for p in params:
         try:
             name = p.Definition.Name
             st   = str(p.StorageType)
@@ -375,13 +587,31 @@ def collect_params(el, max_len=MAX_PARAM_LEN, doc=None):
 # FUNÇÃO 1 — EXTRAIR COMPLETO
 # ============================================================
 
+ELEM_HEADER = [
+    "model", "element_id", "unique_id", "category", "family", "type",
+    "type_id", "level", "workset", "phase_created", "phase_demolished",
+    "design_option", "loc_kind", "loc_value", "bbox_min", "bbox_max", "run_stamp",
+]
+PARAM_HEADER = [
+    "model", "unique_id", "element_id", "scope",
+    "param_name", "storage_type", "value_str", "is_shared", "guid", "group",
+]
+
+# Cabeçalhos só com ASCII, sem aspas: a linha CSV é montada uma vez no import
+# (mesmo terminador "\r\n" do csv.writer) e copiada direto para o buffer.
+_ELEM_HEADER_LINE  = ",".join(ELEM_HEADER) + "\r\n"
+_PARAM_HEADER_LINE = ",".join(PARAM_HEADER) + "\r\n"
+
+
 def extrair_completo(doc, model, model_safe, run_stamp, day, ts):
     """
     Extrai todos os elementos físicos do modelo Revit.
 
     Arquivos gerados:
-      elements.csv          — um elemento por linha com metadados
-      params.csv            — todos os parâmetros (instância + tipo) por elemento
+      elements.csv          — um elemento por linha com metadados (inclui type_id)
+      params.csv            — parâmetros de instância (unique_id/element_id do
+                              elemento) e de tipo, uma vez por tipo
+                              (unique_id/element_id do tipo = type_id)
       model_hierarchy.json  — hierarquia Categoria > Família > Tipo > Instâncias
 
     Parâmetros:
@@ -407,115 +637,229 @@ def extrair_completo(doc, model, model_safe, run_stamp, day, ts):
     params_path_latest   = os.path.join(LATEST_DIR, "params.csv")
     json_path_latest     = os.path.join(LATEST_DIR, "model_hierarchy.json")
 
-    elements = list(FilteredElementCollector(doc).WhereElementIsNotElementType())
-
-    fe     = write_bom_csv(elements_path)
-    fp     = write_bom_csv(params_path)
-    fe_lat = write_bom_csv(elements_path_latest)
-    fp_lat = write_bom_csv(params_path_latest)
-
-    ew     = csv.writer(fe)
-    pw     = csv.writer(fp)
-    ew_lat = csv.writer(fe_lat)
-    pw_lat = csv.writer(fp_lat)
-
-    ELEM_HEADER = [
-        "model", "element_id", "unique_id", "category", "family", "type",
-        "level", "workset", "phase_created", "phase_demolished",
-        "design_option", "loc_kind", "loc_value", "bbox_min", "bbox_max", "run_stamp",
-    ]
-    PARAM_HEADER = [
-        "model", "unique_id", "element_id", "scope",
-        "param_name", "storage_type", "value_str", "is_shared", "guid", "group",
-    ]
-    for w in (ew, ew_lat):
-        w.writerow(ELEM_HEADER)
-    for w in (pw, pw_lat):
-        w.writerow(PARAM_HEADER)
-
-    hierarchy         = {}
-    type_params_cache = {}
-    ok      = 0
-    skipped = 0
-
-    def _write_params(owner_uid, owner_id_str, scope, params_list):
+    # Apenas elementos físicos: WhereElementIsViewIndependent descarta no
+    # filtro nativo o que pertence a uma vista (cotas, textos, tags, linhas
+    # de detalhe, regiões...), antes de qualquer custo Python/API por elemento.
+    # O collector é percorrido direto, sem materializar a lista de elementos;
+    # cada elemento percorrido conta como ok ou skipped, e o total é a soma.
+    elements = (
+        FilteredElementCollector(doc)
+        .WhereElementIsNotElementType()
+        .WhereElementIsViewIndependent()
+    )
+
+    # Só o histórico é escrito durante a extração; o latest recebe uma cópia
+    # dos arquivos prontos no final (cópia de arquivo, sem CSV/JSON de novo).
+    fe = write_bom_csv(elements_path)
+    fp = write_bom_csv(params_path)
+
+    # Colunas constantes na execução: convertidas uma única vez, fora dos loops.
+    model_b  = u8(model)
+    stamp_b  = u8(run_stamp)
+    scope_b  = {"instance": u8("instance"), "type": u8("type")}
+    shared_b = (u8("0"), u8("1"))   # indexado por is_shared (False/True)
+
+    # Produtor/consumidor: a thread principal só lê a API do Revit e monta
+    # lotes de tuplas com os valores já extraídos (strings e dicts Python —
+    # nenhum objeto Revit cruza a fila). A thread de escrita faz o u8, a
+    # formatação CSV e a gravação em disco, em paralelo com a leitura do
+    # próximo lote.
+    wq         = Queue(8)
+    write_errs = []
+
+    def _param_rows(owner_uid_b, owner_id_b, scope, params_list):
+        # Gera a mesma lista a cada linha: writerows formata cada item antes
+        # de pedir o próximo, então sobrescrever as posições é seguro.
+        prow = [model_b, owner_uid_b, owner_id_b, scope_b[scope],
+                "", "", "", "", "", ""]
         for p in params_list:
             try:
-                row = [
-                    u8(model), u8(owner_uid), u8(owner_id_str), u8(scope),
-                    u8(p["name"]), u8(p["storage_type"]), u8(p["value"]),
-                    u8("1" if p["is_shared"] else "0"), u8(p["guid"]), u8(p["group"]),
-                ]
-                pw.writerow(row)
-                pw_lat.writerow(row)
+                prow[4] = _u8_rep(p["name"])
+                prow[5] = _u8_rep(p["storage_type"])
+                prow[6] = u8(p["value"])
+                prow[7] = shared_b[p["is_shared"]]
+                prow[8] = _u8_rep(p["guid"])
+                prow[9] = _u8_rep(p["group"])
             except:
                 continue
+            yield prow
+
+    def _writer():
+        # Buffers, writers e a linha reutilizada pertencem só a esta thread.
+        ebuf = StringIO()
+        pbuf = StringIO()
+        ew_writerow  = csv.writer(ebuf).writerow
+        pw_writerows = csv.writer(pbuf).writerows
+        erow = [model_b] * 16 + [stamp_b]
+        while True:
+            batch = wq.get()
+            if batch is None:
+                return
+            if write_errs:
+                continue
+            try:
+                for row, owner_uid, owner_id, scope, params_list in batch:
+                    owner_uid_b = u8(owner_uid)
+                    owner_id_b  = u8(owner_id)
+                    if row is not None:
+                        # u8/_u8_rep não lançam; só a escrita pode falhar, e
+                        # essa falha vai para write_errs.
+                        erow[1]  = owner_id_b
+                        erow[2]  = owner_uid_b
+                        erow[3]  = _u8_rep(row[0])
+                        erow[4]  = _u8_rep(row[1])
+                        erow[5]  = _u8_rep(row[2])
+                        erow[6]  = _u8_rep(row[3])
+                        erow[7]  = _u8_rep(row[4])
+                        erow[8]  = _u8_rep(row[5])
+                        erow[9]  = _u8_rep(row[6])
+                        erow[10] = _u8_rep(row[7])
+                        erow[11] = _u8_rep(row[8])
+                        erow[12] = u8(row[9])
+                        erow[13] = u8(row[10])
+                        erow[14] = u8(row[11])
+                        erow[15] = u8(row[12])
+                        ew_writerow(erow)
+                    # Um writerows por dono (elemento ou tipo) em vez de um
+                    # writerow por parâmetro.
+                    if params_list:
+                        pw_writerows(_param_rows(owner_uid_b, owner_id_b,
+                                                 scope, params_list))
+                for buf, f in ((ebuf, fe), (pbuf, fp)):
+                    f.write(buf.getvalue())
+                    buf.seek(0)
+                    buf.truncate()
+            except Exception as ex:
+                write_errs.append(ex)
+
+    # Cabeçalhos gravados antes de a thread começar: saem mesmo num modelo
+    # sem nenhum elemento, quando nenhum lote chega à fila.
+    fe.write(_ELEM_HEADER_LINE)
+    fp.write(_PARAM_HEADER_LINE)
+
+    wt = threading.Thread(target=_writer)
+    wt.daemon = True
+    wt.start()
+
+    # Lote corrente: (linha do elemento ou None, UniqueId do dono, Id do
+    # dono, escopo, parâmetros). None marca os parâmetros de um tipo.
+    batch   = []
+    bappend = batch.append
+
+    hierarchy = {}
+    ok        = 0
+    skipped   = 0
+
+    # Milhares de instâncias compartilham poucos tipos/categorias: tudo que
+    # depende só do tipo (ou da categoria) é resolvido uma vez e memorizado.
+    type_info   = {}  # TypeId (int)         → (família, tipo, type_id_str, params do tipo, UniqueId do tipo)
+    cat_names   = {}  # Category.Id (int)    → nome da categoria
+    hier_nodes  = {}  # (cat, família, tipo) → (cat_node, fam_node, typ_node) da hierarquia
+    level_names = {}  # LevelId (int)        → nome do nível
+    ws_names    = {}  # WorksetId (int)      → nome do workset
+
+    # Tabela de worksets obtida uma vez; sem worksets (modelo não
+    # compartilhado) a coluna fica vazia sem consultar cada elemento.
+    try:
+        ws_table = doc.GetWorksetTable() if doc.IsWorkshared else None
+    except:
+        ws_table = None
 
-    for el in elements:
+    def _type_info(type_id):
+        fam, typ, type_id_str, type_params, type_uid = u"", u"", "", [], ""
         try:
-            cat        = safe_str(el.Category.Name) if el.Category else ""
-            fam, typ   = get_family_type(el)
-            lvl        = get_level_name(el)
-            workset    = get_workset_name(el)
-            phase_c, phase_d = get_phase_names(el)
-            design_opt = get_design_option(el)
-            loc        = location_to_dict(el)
-            bb         = bbox_to_dict(el.get_BoundingBox(None))
-
-            el_id     = eid_int(el.Id)
-            el_id_str = str(el_id) if el_id is not None else ""
+            t = doc.GetElement(type_id)
+            if t:
+                try:
+                    fam = t.FamilyName or u""
+                except:
+                    pass
+                try:
+                    typ = t.Name or u""
+                except:
+                    pass
+                tid = eid_int(t.Id)
+                type_id_str = str(tid) if tid is not None else ""
+                type_params = collect_params(t, MAX_PARAM_LEN, doc)
+                type_uid    = t.UniqueId
+        except:
+            pass
+        return (fam, typ, type_id_str, type_params, type_uid)
 
-            inst_params = collect_params(el, MAX_PARAM_LEN, doc)
+    try:
+        for el in elements:
+            # Guardas só onde a API pode de fato falhar; os helpers já devolvem
+            # valores vazios. Elementos ilegíveis contam como skipped.
+            try:
+                uid = el.UniqueId
+                c   = el.Category
+                if c:
+                    ckey = eid_int(c.Id)
+                    cat  = cat_names.get(ckey)
+                    if cat is None:
+                        cat = cat_names[ckey] = safe_str(c.Name)
+                else:
+                    ckey = None
+                    cat  = ""
+            except Exception:
+                skipped += 1
+                continue
 
-            type_params = []
-            type_id_str = ""
+            # Demais leituras (tipo, Id, parâmetros) também podem lançar num
+            # elemento corrompido: ele conta como skipped e a extração segue.
+            # Os bappend ficam no fim, para não deixar linhas parciais no lote.
             try:
-                t = doc.GetElement(el.GetTypeId())
-                if t:
-                    type_id_str = str(eid_int(t.Id)) if eid_int(t.Id) is not None else ""
-                    if type_id_str not in type_params_cache:
-                        type_params_cache[type_id_str] = collect_params(t, MAX_PARAM_LEN, doc)
-                    type_params = type_params_cache[type_id_str]
-            except:
-                pass
+                tid      = el.GetTypeId()
+                tkey     = eid_int(tid)
+                info     = type_info.get(tkey)
+                new_type = info is None
+                if new_type:
+                    info = _type_info(tid)
+                fam, typ, type_id_str, type_params, type_uid = info
+
+                lvl        = get_level_name(el, level_names)
+                workset    = (get_workset_name(el, ws_names, ws_table)
+                              if ws_table is not None else "")
+                phase_c, phase_d = get_phase_names(el)
+                design_opt = get_design_option(el)
+                loc        = location_to_dict(el)
+                if not INCLUDE_BBOX or ckey in _BBOX_SKIP_CATEGORIES:
+                    bb = bbox_to_dict(None)
+                else:
+                    try:
+                        bb = bbox_to_dict(el.get_BoundingBox(None))
+                    except Exception:
+                        bb = bbox_to_dict(None)
 
-            row = [
-                u8(model), u8(el_id_str), u8(el.UniqueId),
-                u8(cat), u8(fam), u8(typ), u8(lvl), u8(workset),
-                u8(phase_c), u8(phase_d), u8(design_opt),
-                u8(loc["kind"]), u8(loc["value"]),
-                u8(bb["min"]), u8(bb["max"]), u8(run_stamp),
-            ]
-            ew.writerow(row)
-            ew_lat.writerow(row)
+                el_id     = eid_int(el.Id)
+                el_id_str = str(el_id) if el_id is not None else ""
 
-            _write_params(el.UniqueId, el_id_str, "instance", inst_params)
-            _write_params(el.UniqueId, el_id_str, "type",     type_params)
+                inst_params = collect_params(el, MAX_PARAM_LEN, doc)
+            except Exception:
+                skipped += 1
+                continue
 
             # Hierarquia JSON
-            cat_node = hierarchy.setdefault(cat, {"total": 0, "families": {}})
-            cat_node["total"] += 1
-
-            fam_node = cat_node["families"].setdefault(fam, {"total": 0, "types": {}})
-            fam_node["total"] += 1
-
-            if typ not in fam_node["types"]:
-                type_params_for_json = {}
-                if INCLUDE_TYPE_PARAMS_IN_JSON:
-                    for tp in type_params:
-                        type_params_for_json[tp["name"]] = tp["value"]
-                fam_node["types"][typ] = {
+            nodes = hier_nodes.get((cat, fam, typ))
+            if nodes is None:
+                cat_node = hierarchy.setdefault(
+                    cat, {"total": 0, "total_types": 0, "families": {}})
+                fam_node = cat_node["families"].setdefault(fam, {"total": 0, "types": {}})
+                typ_node = fam_node["types"][typ] = {
                     "total":       0,
-                    "type_params": type_params_for_json,
+                    "type_params": (dict(map(_name_value, type_params))
+                                    if INCLUDE_TYPE_PARAMS_IN_JSON else {}),
                     "instances":   [],
                 }
-
-            typ_node = fam_node["types"][typ]
+                cat_node["total_types"] += 1
+                nodes = hier_nodes[(cat, fam, typ)] = (cat_node, fam_node, typ_node)
+            cat_node, fam_node, typ_node = nodes
+            cat_node["total"] += 1
+            fam_node["total"] += 1
             typ_node["total"] += 1
-            inst_params_json = {p["name"]: p["value"] for p in inst_params}
             typ_node["instances"].append({
                 "element_id":       el_id_str,
-                "unique_id":        el.UniqueId,
+                "unique_id":        uid,
                 "level":            lvl,
                 "workset":          workset,
                 "phase_created":    phase_c,
@@ -523,18 +867,33 @@ def extrair_completo(doc, model, model_safe, run_stamp, day, ts):
                 "design_option":    design_opt,
                 "location":         loc,
                 "bbox":             bb,
-                "instance_params":  inst_params_json,
+                "instance_params":  dict(map(_name_value, inst_params)),
             })
 
-            ok += 1
-        except:
-            skipped += 1
-            continue
+            if new_type:
+                # Parâmetros de tipo: uma única vez por tipo, não por instância.
+                # O elemento liga-se a eles pela coluna type_id do elements.csv.
+                type_info[tkey] = info
+                bappend((None, type_uid, type_id_str, "type", type_params))
+            bappend(((cat, fam, typ, type_id_str, lvl, workset, phase_c,
+                      phase_d, design_opt, loc["kind"], loc["value"],
+                      bb["min"], bb["max"]),
+                     uid, el_id_str, "instance", inst_params))
 
-    fe.close()
-    fp.close()
-    fe_lat.close()
-    fp_lat.close()
+            ok += 1
+            if not ok % FLUSH_EVERY:
+                wq.put(batch)
+                batch   = []
+                bappend = batch.append
+    finally:
+        if batch:
+            wq.put(batch)
+        wq.put(None)
+        wt.join()
+        fe.close()
+        fp.close()
+    if write_errs:
+        raise write_errs[0]
 
     output_json = {
         "model":            model,
@@ -548,13 +907,18 @@ def extrair_completo(doc, model, model_safe, run_stamp, day, ts):
         "total_categories": len(hierarchy),
         "hierarchy":        hierarchy,
     }
-    write_json_file(json_path, output_json)
-    write_json_file(json_path_latest, output_json)
+    # Hierarquia completa: o maior JSON gerado, consumido por ferramentas
+    # (BI / notebooks) — gravado compacto, sem indentação.
+    write_json_file(json_path, output_json, compact=True)
+
+    shutil.copyfile(elements_path, elements_path_latest)
+    shutil.copyfile(params_path,   params_path_latest)
+    shutil.copyfile(json_path,     json_path_latest)
 
     return {
         "ok":         ok,
         "skipped":    skipped,
-        "n_elements": len(elements),
+        "n_elements": ok + skipped,
         "run_dir":    RUN_DIR,
         "latest_dir": LATEST_DIR,
         "hierarchy":  hierarchy,
@@ -588,10 +952,12 @@ def extrair_metadados(doc, model, model_safe, run_stamp, day, ts):
 
     sheets = FilteredElementCollector(doc).OfClass(ViewSheet).ToElements()
 
-    f     = write_bom_csv(out)
-    f_lat = write_bom_csv(out_latest)
-    w     = csv.writer(f)
-    w_lat = csv.writer(f_lat)
+    # Viewport → vista resolvido em lote: um collector de vistas e um de
+    # viewports, em vez de dois doc.GetElement por viewport de cada folha.
+    views = dict((eid_int(v.Id), v)
+                 for v in FilteredElementCollector(doc).OfClass(View))
+    vp_views = dict((eid_int(vp.Id), views.get(eid_int(vp.ViewId)))
+                    for vp in FilteredElementCollector(doc).OfClass(Viewport))
 
     HEADER = [
         "model",           # Nome do arquivo Revit
@@ -606,25 +972,54 @@ def extrair_metadados(doc, model, model_safe, run_stamp, day, ts):
         "view_scale",      # Escala (ex: 50 = 1:50)
         "is_template",     # 1 = template | 0 = vista normal
     ]
-    w.writerow(HEADER)
-    w_lat.writerow(HEADER)
+    # Linhas acumuladas em memória e gravadas de uma vez no final: um
+    # write por arquivo em vez de um por linha (e por cópia).
+    rows = [HEADER]
+
+    model_b = u8(model)
+    stamp_b = u8(run_stamp)
 
     total_pairs = 0
     skipped     = 0
 
+    # str() de enum .NET passa por reflexão; há poucos valores distintos de
+    # ViewType/Discipline, então a conversão é memorizada pelo próprio enum.
+    vtype_str = {}
+    disc_str  = {}
+
+    # Métodos ligados uma vez, fora do laço por viewport.
+    vp_view     = vp_views.get
+    rows_append = rows.append
+
     for sh in sheets:
         try:
             vports = sh.GetAllViewports()
+            # Colunas da folha: convertidas uma vez, repetidas em cada vista.
+            sh_cols = [
+                model_b,
+                stamp_b,
+                u8(safe_str(sh.SheetNumber)),
+                u8(safe_str(sh.Name)),
+                sh.Id.ToString(),
+            ]
+            # A vista ausente é testada explicitamente e só as propriedades que
+            # de fato lançam em certos tipos de vista (Discipline, Scale,
+            # IsTemplate) têm guarda própria; o try externo isola falhas
+            # inesperadas na própria viewport, sem perder o resto da folha.
             for vpid in vports:
                 try:
-                    vp = doc.GetElement(vpid)
-                    v  = doc.GetElement(vp.ViewId)
+                    v = vp_view(eid_int(vpid))
+                    if v is None:
+                        skipped += 1
+                        continue
 
-                    discipline = ""
                     try:
-                        discipline = str(v.Discipline)
+                        d = v.Discipline
+                        discipline = disc_str.get(d)
+                        if discipline is None:
+                            discipline = disc_str[d] = str(d)
                     except:
-                        pass
+                        discipline = ""
 
                     scale = ""
                     try:
@@ -638,21 +1033,22 @@ def extrair_metadados(doc, model, model_safe, run_stamp, day, ts):
                     except:
                         pass
 
-                    row = [
-                        u8(model),
-                        u8(run_stamp),
-                        u8(safe_str(sh.SheetNumber)),
-                        u8(safe_str(sh.Name)),
-                        u8(sh.Id.ToString()),
-                        u8(v.Id.ToString()),
+                    vt    = v.ViewType
+                    vtype = vtype_str.get(vt)
+                    if vtype is None:
+                        vtype = vtype_str[vt] = str(vt)
+
+                    # Só os nomes podem ter acentos e passam por u8; Ids, nomes
+                    # de enum, escala e flag são sempre ASCII e vão direto.
+                    row = sh_cols + [
+                        v.Id.ToString(),
                         u8(safe_str(v.Name)),
-                        u8(str(v.ViewType)),
-                        u8(discipline),
-                        u8(scale),
-                        u8(is_template),
+                        vtype,
+                        discipline,
+                        scale,
+                        is_template,
                     ]
-                    w.writerow(row)
-                    w_lat.writerow(row)
+                    rows_append(row)
                     total_pairs += 1
                 except:
                     skipped += 1
@@ -661,8 +1057,7 @@ def extrair_metadados(doc, model, model_safe, run_stamp, day, ts):
             skipped += 1
             continue
 
-    f.close()
-    f_lat.close()
+    save_bom_csv(rows, out, out_latest)
 
     return {
         "total_pairs": total_pairs,
@@ -728,9 +1123,27 @@ def extrair_inventario_por_folha(doc, model, model_safe, run_stamp, day, now):
     sheet_el_info = defaultdict(dict)   # sheet_id → {el_id: (cat, fam, typ)}
     total_seen    = 0
 
-    for vs in (FilteredElementCollector(doc)
-               .OfClass(ViewSheet)
-               .WhereElementIsNotElementType()):
+    # CATEGORIAS_INCLUIR resolvida para Ids inteiros (memorizada por idioma):
+    # o loop por elemento compara inteiros, sem ler Category.Name.
+    cat_incluir = _categorias_incluir(doc)   # Category.Id (int) → nome
+    fam_types   = {}                         # TypeId (int) → (família, tipo)
+
+    # As mesmas categorias como filtro nativo: o collector de cada vista já
+    # devolve só os elementos monitorados, em vez de todos os da vista. Os
+    # Ids saem do mapa memorizado, sem percorrer doc.Settings.Categories.
+    cat_ids = List[ElementId]([ElementId(cid) for cid in cat_incluir])
+    if cat_ids.Count:
+        cat_filter = ElementMulticategoryFilter(cat_ids)
+        sheets_iter = (FilteredElementCollector(doc)
+                       .OfClass(ViewSheet)
+                       .WhereElementIsNotElementType())
+    else:
+        sheets_iter = []   # nenhuma categoria monitorada neste documento
+
+    # Método ligado uma vez: evita a busca de atributo em doc a cada viewport.
+    get_el = doc.GetElement
+
+    for vs in sheets_iter:
         try:
             sid = eid_int(vs.Id)
             if sid not in sheets_data:
@@ -738,33 +1151,34 @@ def extrair_inventario_por_folha(doc, model, model_safe, run_stamp, day, now):
             vp_ids = vs.GetAllViewports()
             if not vp_ids:
                 continue
+            seen = sheet_el_info[sid]   # el_id → (cat, fam, typ) desta folha
 
             for vp_id in vp_ids:
                 try:
-                    vp = doc.GetElement(vp_id)
+                    vp = get_el(vp_id)
                     if not vp:
                         continue
                     view_id = vp.ViewId
-                    view    = doc.GetElement(view_id)
+                    view    = get_el(view_id)
                     if not view:
                         continue
 
                     for el in (FilteredElementCollector(doc, view_id)
+                               .WherePasses(cat_filter)
                                .WhereElementIsNotElementType()):
                         try:
-                            cat_obj = el.Category
-                            if not cat_obj:
-                                continue
-                            cat = cat_obj.Name or u""
-                            if cat not in CATEGORIAS_INCLUIR:
-                                continue
+                            # Já contado por outra vista da mesma folha: sai
+                            # antes de qualquer leitura de categoria/tipo.
                             el_id = eid_int(el.Id)
-                            if el_id is None:
+                            if el_id is None or el_id in seen:
+                                continue
+                            # cat_filter garante categoria não nula e monitorada.
+                            cat = cat_incluir.get(eid_int(el.Category.Id))
+                            if cat is None:
                                 continue
-                            if el_id not in sheet_el_info[sid]:
-                                fam, typ = get_family_type(el)
-                                sheet_el_info[sid][el_id] = (cat, fam, typ)
-                                total_seen += 1
+                            fam, typ = get_family_type(el, fam_types)
+                            seen[el_id] = (cat, fam, typ)
+                            total_seen += 1
                         except:
                             continue
                 except:
@@ -775,56 +1189,54 @@ def extrair_inventario_por_folha(doc, model, model_safe, run_stamp, day, now):
     # ----------------------------------------------------------
     # 3) Agrega: (folha, fam, typ) → quantidade
     # ----------------------------------------------------------
-    inventario = defaultdict(lambda: defaultdict(int))
+    # Um Counter por folha, alimentado por um gerador sobre os elementos já
+    # deduplicados — sem += por elemento no Python. Folhas visitadas sem
+    # nenhum elemento monitorado ficam fora, como antes.
+    inventario = {}
     for sid, el_dict in sheet_el_info.items():
-        for el_id, (cat, fam, typ) in el_dict.items():
-            inventario[sid][(fam, typ)] += 1
+        if el_dict:
+            inventario[sid] = Counter(
+                (fam, typ) for cat, fam, typ in el_dict.values())
 
     folhas_com_itens = len(inventario)
     folhas_sem_itens = len(sheets_data) - folhas_com_itens
 
     totais = Counter()
-    for sid, itens in inventario.items():
-        for chave, cnt in itens.items():
-            totais[chave] += cnt
+    for itens in inventario.values():
+        totais.update(itens)
 
     # ----------------------------------------------------------
     # 4) CSV — inventário por folha
     # ----------------------------------------------------------
-    def write_folha_csv(path):
-        f = write_bom_csv(path)
-        wr = csv.writer(f)
-        wr.writerow(["model", "run_stamp", "folha", "folha_nome",
-                     "elemento", "nome", "qtd"])
+    # As linhas são geradas e formatadas uma única vez; save_bom_csv grava o
+    # mesmo texto no histórico e no latest.
+    model_b = u8(model)
+    stamp_b = u8(run_stamp)
+
+    def folha_rows():
+        yield ["model", "run_stamp", "folha", "folha_nome",
+               "elemento", "nome", "qtd"]
         for sid in sorted(inventario.keys(),
                           key=lambda x: sheets_data.get(x, {}).get("numero", "")):
             sh    = sheets_data.get(sid, {"numero": "", "nome": ""})
             itens = inventario[sid]
             for (fam, typ), cnt in sorted(itens.items(),
                                           key=lambda x: (x[0][0], x[0][1])):
-                wr.writerow([
-                    u8(model), u8(run_stamp),
-                    u8(sh["numero"]), u8(sh["nome"]),
-                    u8(fam), u8(typ), u8(cnt),
-                ])
-        f.close()
+                yield [model_b, stamp_b,
+                       u8(sh["numero"]), u8(sh["nome"]),
+                       u8(fam), u8(typ), u8(cnt)]
 
-    write_folha_csv(out_folha)
-    write_folha_csv(out_folha_lat)
+    save_bom_csv(folha_rows(), out_folha, out_folha_lat)
 
     # ----------------------------------------------------------
     # 5) CSV — totais globais
     # ----------------------------------------------------------
-    def write_totais_csv(path):
-        f = write_bom_csv(path)
-        wr = csv.writer(f)
-        wr.writerow(["model", "run_stamp", "elemento", "nome", "qtd_total"])
+    def totais_rows():
+        yield ["model", "run_stamp", "elemento", "nome", "qtd_total"]
         for (fam, typ), cnt in sorted(totais.items(), key=lambda x: -x[1]):
-            wr.writerow([u8(model), u8(run_stamp), u8(fam), u8(typ), u8(cnt)])
-        f.close()
+            yield [model_b, stamp_b, u8(fam), u8(typ), u8(cnt)]
 
-    write_totais_csv(out_totais)
-    write_totais_csv(out_tot_lat)
+    save_bom_csv(totais_rows(), out_totais, out_tot_lat)
 
     # ----------------------------------------------------------
     # 6) JSON
@@ -861,13 +1273,14 @@ def extrair_inventario_por_folha(doc, model, model_safe, run_stamp, day, now):
         ],
     }
 
+    # Serializado uma vez; o latest recebe cópia do arquivo pronto.
     write_json_file(out_json, resultado)
-    write_json_file(out_json_lat, resultado)
+    shutil.copyfile(out_json, out_json_lat)
 
     return {
         "sheets_data":      sheets_data,
         "inventario":       dict(inventario),
-        "totais":           dict(totais),
+        "totais":           totais,
         "folhas_com_itens": folhas_com_itens,
         "folhas_sem_itens": folhas_sem_itens,
         "total_seen":       total_seen,
@@ -986,44 +1399,59 @@ def extrair_inventario_por_pavimento(
     cat_sem_sap     = Counter()  # categoria → elementos sem SAP
     erros_extracao  = 0
 
-    elements = list(FilteredElementCollector(doc).WhereElementIsNotElementType())
+    # Despacho por categoria: Category.Id (int) → nome normalizado, ou None
+    # quando a categoria é ignorada. Nome e filtro são resolvidos uma vez por
+    # categoria; cada elemento faz um único lookup de inteiro.
+    cat_info = {}
 
-    for el in elements:
+    # Código SAP do tipo: TypeId (int) → valor (get_sap_code consulta o tipo
+    # uma vez; as demais instâncias sem código próprio reaproveitam).
+    sap_por_tipo = {}
+    fam_types    = {}   # TypeId (int)  → (família, tipo)
+    level_names  = {}   # LevelId (int) → nome do nível
+
+    for el in FilteredElementCollector(doc).WhereElementIsNotElementType():
         try:
-            # ---- Filtros de fase ----
-            phase_c, phase_d = get_phase_names(el)
-            if filtro_fase_criacao is not None and phase_c != filtro_fase_criacao:
+            # ---- Categoria (antes das fases: descarta cedo as ignoradas) ----
+            cat_obj = el.Category
+            if not cat_obj:
                 total_ignorado += 1
                 continue
-            if filtro_fase_demolicao and phase_d:
+            cid = eid_int(cat_obj.Id)
+            if cid in cat_info:
+                cat = cat_info[cid]
+            else:
+                cat = _n(cat_obj.Name) or u"(sem categoria)"
+                if cat.lower() in ignored_cats_lower:
+                    cat = None
+                cat_info[cid] = cat
+            if cat is None:
                 total_ignorado += 1
                 continue
 
-            # ---- Categoria ----
-            cat_obj = el.Category
-            if not cat_obj:
+            # ---- Filtros de fase ----
+            phase_c, phase_d = get_phase_names(el)
+            if filtro_fase_criacao is not None and phase_c != filtro_fase_criacao:
                 total_ignorado += 1
                 continue
-            cat = _n(cat_obj.Name) or u"(sem categoria)"
-
-            # ---- Filtra categorias ignoradas ----
-            if cat.lower() in ignored_cats_lower:
+            if filtro_fase_demolicao and phase_d:
                 total_ignorado += 1
                 continue
 
             # ---- Família / Tipo ----
-            fam_raw, typ_raw = get_family_type(el)
+            fam_raw, typ_raw = get_family_type(el, fam_types)
             fam = _n(fam_raw)
             typ = _n(typ_raw)
 
             # ---- Localização ----
-            lvl_raw  = get_level_name(el)
+            lvl_raw  = get_level_name(el, level_names)
             room_raw = get_room_name(el, doc, param_names=room_param_names)
             lvl      = _n(lvl_raw)  or u"(sem pavimento)"
             room     = _n(room_raw) or u"(sem ambiente)"
 
             # ---- Código SAP ----
-            sap = get_sap_code(el, doc, param_names=sap_param_names)
+            sap = get_sap_code(el, doc, param_names=sap_param_names,
+                               type_cache=sap_por_tipo)
 
             # ---- Relatório de conformidade ----
             el_uid = el.UniqueId
@@ -1102,10 +1530,11 @@ def extrair_inventario_por_pavimento(
     HEADER_PHASE = ["phase_created", "phase_demolished"]
     HEADER = HEADER_BASE + (HEADER_PHASE if include_phases_csv else [])
 
-    def _write_csv(path):
-        f  = write_bom_csv(path)
-        wr = csv.writer(f)
-        wr.writerow(HEADER)
+    model_b = u8(model)
+    stamp_b = u8(run_stamp)
+
+    def _csv_rows():
+        yield HEADER
         for pav in sorted(inventario.keys()):
             for amb in sorted(inventario[pav].keys()):
                 for cat in sorted(inventario[pav][amb].keys()):
@@ -1113,7 +1542,7 @@ def extrair_inventario_por_pavimento(
                         for typ, info in sorted(
                                 inventario[pav][amb][cat][fam].items()):
                             row = [
-                                u8(model),        u8(run_stamp),
+                                model_b,          stamp_b,
                                 u8(pav),          u8(amb),
                                 u8(cat),          u8(fam),
                                 u8(typ),          u8(info["sap_code"]),
@@ -1124,11 +1553,10 @@ def extrair_inventario_por_pavimento(
                                     u8(info["phase_created"]),
                                     u8(info["phase_demolished"]),
                                 ]
-                            wr.writerow(row)
-        f.close()
+                            yield row
 
-    _write_csv(out_csv)
-    _write_csv(out_csv_lat)
+    # Formatado uma única vez e gravado igual no histórico e no latest.
+    save_bom_csv(_csv_rows(), out_csv, out_csv_lat)
 
     # ----------------------------------------------------------
     # JSON — hierarquia completa + flat_items + conformidade
@@ -1243,14 +1671,15 @@ def extrair_inventario_por_pavimento(
     if export_flat:
         resultado["flat_items"] = flat_items
 
+    # Cada JSON é serializado uma vez; o latest recebe cópia do arquivo pronto.
     write_json_file(out_json, resultado)
-    write_json_file(out_json_lat, resultado)
     write_json_file(out_conf, conformidade)
-    write_json_file(out_conf_lat, conformidade)
+    shutil.copyfile(out_json, out_json_lat)
+    shutil.copyfile(out_conf, out_conf_lat)
 
     return {
         "inventario":     inventario,
-        "totais_globais": dict(totais_globais),
+        "totais_globais": totais_globais,
         "total_incluido": total_incluido,
         "total_ignorado": total_ignorado,
         "conformidade":   conformidade,
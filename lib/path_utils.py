@@ -17,6 +17,7 @@ Exportacoes publicas:
   u8(x)                        -- qualquer valor -> string CSV-safe
   safe_str(x)                  -- None -> ""
   write_bom_csv(path)          -- abre CSV com BOM UTF-8
+  save_bom_csv(rows, *paths)   -- grava as mesmas linhas CSV em varios arquivos
   write_json_file(path, data)  -- salva dict como JSON com BOM UTF-8
 
 Compativel com IronPython 2 / CPython 3
@@ -24,7 +25,9 @@ Compativel com IronPython 2 / CPython 3
 
 import os
 import csv
+import shutil
 import json
+import codecs
 import sys
 import datetime
 
@@ -34,6 +37,13 @@ import datetime
 BASE_DIR         = os.path.join(os.path.expanduser("~"), "Desktop")
 ROOT_FOLDER_NAME = "RevitScan"
 
+# BOM UTF-8 ja codificado — faz o Excel reconhecer o encoding.
+_BOM = b"\xef\xbb\xbf"
+
+# Buffer de escrita dos arquivos de saida (1 MiB): os dumps grandes
+# (elements.csv, params.csv, hierarquia JSON) fazem poucos flushes em disco.
+_IO_BUFFER = 1 << 20
+
 # ============================================================
 # COMPAT Python 2 / 3
 # ============================================================
@@ -106,35 +116,61 @@ def build_latest_dir(model_safe, plugin_name):
 
 def ensure_dirs(*paths):
     """Cria todas as pastas fornecidas (equivalente a mkdir -p)."""
+    # makedirs direto, sem exists() antes: evita a corrida entre o teste e a
+    # criacao. IronPython 2 nao tem exist_ok, entao o OSError so e propagado
+    # se a pasta de fato nao existir.
     for p in paths:
-        if not os.path.exists(p):
+        try:
             os.makedirs(p)
+        except OSError:
+            if not os.path.isdir(p):
+                raise
 
 
 # ============================================================
 # CONVERSAO DE VALOR PARA STRING
 # ============================================================
 
-def u8(x):
-    """
-    Converte qualquer valor para string compativel com csv.writer.
-    Funciona tanto em IronPython 2 (necessita bytes) quanto CPython 3.
-    """
-    try:
+# Uma definicao por versao do Python, escolhida no import: u8 roda para
+# cada celula dos CSVs, entao o teste de versao nao fica dentro da funcao.
+# type(x) is ... cobre os casos comuns sem o isinstance; subclasses caem
+# no caminho generico.
+if sys.version_info[0] >= 3:
+    def u8(x):
+        """
+        Converte qualquer valor para string compativel com csv.writer.
+        Funciona tanto em IronPython 2 (necessita bytes) quanto CPython 3.
+        """
+        if type(x) is str:
+            return x
         if x is None:
             return ""
-        if sys.version_info[0] >= 3:
+        try:
             return str(x)
-        if isinstance(x, _unicode):
+        except:
+            return ""
+else:
+    def u8(x):
+        """
+        Converte qualquer valor para string compativel com csv.writer.
+        Funciona tanto em IronPython 2 (necessita bytes) quanto CPython 3.
+        """
+        t = type(x)
+        if t is _unicode:
             return x.encode("utf-8")
-        return str(x)
-    except:
+        if t is str:
+            return x
+        if x is None:
+            return ""
         try:
-            if sys.version_info[0] < 3:
-                return _unicode(x).encode("utf-8")
+            if isinstance(x, _unicode):
+                return x.encode("utf-8")
             return str(x)
         except:
-            return ""
+            try:
+                return _unicode(x).encode("utf-8")
+            except:
+                return ""
 
 
 def safe_str(x):
@@ -152,29 +188,57 @@ def write_bom_csv(path):
     O BOM faz o Excel reconhecer o encoding automaticamente.
     - CPython 3 : usa parametro encoding='utf-8-sig'
     - IronPython 2: modo binario com BOM manual
+    Ambos com buffer de _IO_BUFFER bytes.
     """
     if sys.version_info[0] >= 3:
-        f = open(path, "w", encoding="utf-8-sig", newline="")
+        f = open(path, "w", _IO_BUFFER, encoding="utf-8-sig", newline="")
     else:
-        f = open(path, "wb")
-        f.write(b"\xef\xbb\xbf")
+        f = open(path, "wb", _IO_BUFFER)
+        f.write(_BOM)
     return f
 
 
-def write_json_file(path, data):
+def save_bom_csv(rows, *paths):
+    """
+    Grava as linhas uma unica vez no primeiro caminho (historico) com um
+    unico writerows; os demais (latest) recebem uma copia do arquivo pronto.
+    As linhas ja devem vir convertidas com u8.
+    O arquivo ja tem buffer de _IO_BUFFER bytes: o writerows vai direto nele,
+    sem montar o CSV inteiro numa string antes.
+    """
+    first = paths[0]
+    f = write_bom_csv(first)
+    try:
+        csv.writer(f).writerows(rows)
+    finally:
+        f.close()
+    for path in paths[1:]:
+        shutil.copyfile(first, path)
+
+
+def write_json_file(path, data, compact=False):
     """
     Serializa um dict como JSON com indentacao e BOM UTF-8.
     Compativel com IronPython 2 (sem argumento encoding) e CPython 3.
+
+    Usa json.dump direto no arquivo: o JSON e codificado em partes, sem
+    montar a string completa (nem sua copia UTF-8) em memoria.
+
+    compact=True grava sem indentacao e com separadores minimos — para
+    dumps grandes, consumidos por maquina (ex.: hierarquia completa).
     """
-    json_str = json.dumps(data, ensure_ascii=False, indent=2)
+    if compact:
+        fmt = {"indent": None, "separators": (",", ":")}
+    else:
+        fmt = {"indent": 2}
     if sys.version_info[0] >= 3:
-        with open(path, "w", encoding="utf-8-sig") as fj:
-            fj.write(json_str)
+        with open(path, "w", _IO_BUFFER, encoding="utf-8-sig") as fj:
+            json.dump(data, fj, ensure_ascii=False, **fmt)
     else:
-        fj = open(path, "wb")
-        fj.write(b"\xef\xbb\xbf")
-        if isinstance(json_str, _unicode):
-            fj.write(json_str.encode("utf-8"))
-        else:
-            fj.write(json_str)
-        fj.close()
+        fj = open(path, "wb", _IO_BUFFER)
+        try:
+            fj.write(_BOM)
+            json.dump(data, codecs.getwriter("utf-8")(fj),
+                      ensure_ascii=False, **fmt)
+        finally:
+            fj.close()